@@ -0,0 +1,8 @@
+import os
+
+# Where the app keeps its own state (checkpoints, settings, archive)
+def app_data_dir(*parts):
+    root = os.getenv("WHISPER_GUI_HOME", os.path.join(os.path.expanduser("~"), ".whisper_gui"))
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,124 @@
+import os
+import json
+import bisect
+import hashlib
+from app_paths import app_data_dir
+from segment_store import SegmentStore
+
+# Chunk fingerprints of transcribed audio, so an edited re-export of a file only
+# has the part that changed transcribed again. The decoded audio is hashed in
+# fixed-size chunks aligned to its start and, separately, to its end. Comparing
+# them with the previous version finds the unchanged head and tail; trims, cuts
+# and inserts shift the tail, which is why it is aligned to the end. Segments
+# from the unchanged parts are reused with shifted timestamps and the model only
+# runs on the changed span plus a context margin on both sides.
+
+CHUNK_SECONDS = 1
+CONTEXT_SECONDS = 10  # Re-transcribed around an edit so sentences cut by it are decoded whole
+VERSIONS_DIR = "versions"
+
+def _chunk_digest(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+def fingerprint(audio, sample_rate):
+    # Head- and tail-aligned chunk hashes of decoded float32 audio
+    chunk = CHUNK_SECONDS * sample_rate
+    data = memoryview(audio).cast("B")
+    size = chunk * audio.itemsize
+    total = len(data)
+    count = total // size
+    return {
+        "samples": len(audio),
+        "chunk": chunk,
+        "head": [_chunk_digest(data[i * size:(i + 1) * size]) for i in range(count)],
+        "tail": [_chunk_digest(data[total - (i + 1) * size:total - i * size]) for i in range(count)]
+    }
+
+def _common_count(a, b):
+    count = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        count += 1
+    return count
+
+def version_path(file_path, model, options):
+    # One previous version per file, model and decoding options
+    payload = json.dumps({"file": os.path.abspath(file_path), "model": model, "options": options}, sort_keys=True)
+    return os.path.join(app_data_dir(VERSIONS_DIR), hashlib.sha256(payload.encode("utf-8")).hexdigest() + ".json")
+
+def load_version(file_path, model, options):
+    try:
+        with open(version_path(file_path, model, options), encoding="utf-8") as f:
+            record = json.load(f)
+        record["segments"] = SegmentStore.from_json(record["segments"])
+        return record
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_version(file_path, model, options, audio_fingerprint, segments, language):
+    if not isinstance(segments, SegmentStore):
+        segments = SegmentStore.from_segments(segments)
+    path = version_path(file_path, model, options)
+    record = {
+        "file_path": file_path,
+        "fingerprint": audio_fingerprint,
+        "segments": segments.to_json(),
+        "language": language
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+
+def plan_update(previous, audio_fingerprint, sample_rate, context_seconds=CONTEXT_SECONDS):
+    # Work out which part of the new audio has to be transcribed again. Returns None
+    # when nothing can be reused, otherwise the range to transcribe in seconds (end
+    # None means to the end of the file) and the reusable segments before and after it.
+    old = previous["fingerprint"]
+    new = audio_fingerprint
+    if old["chunk"] != new["chunk"]:
+        return None
+    chunk = new["chunk"]
+    head = _common_count(old["head"], new["head"]) * chunk
+    tail = _common_count(old["tail"], new["tail"]) * chunk
+    # Repeated content can make head and tail overlap, the edit is at least empty
+    tail = max(min(tail, old["samples"] - head, new["samples"] - head), 0)
+    if head == 0 and tail == 0:
+        return None
+
+    shift = (new["samples"] - old["samples"]) / sample_rate
+    margin = context_seconds * sample_rate
+    old_changed_end = old["samples"] - tail
+    identical = old["samples"] == new["samples"] and head + tail == new["samples"]
+
+    segments = previous["segments"]
+    if identical:
+        before, after = segments, SegmentStore()
+    else:
+        # Segments are in time order, so the reusable ones are a prefix and a suffix
+        first_changed = 0
+        while first_changed < len(segments) and segments.ends[first_changed] * sample_rate <= head - margin:
+            first_changed += 1
+        after_index = bisect.bisect_left(segments.starts, (old_changed_end + margin) / sample_rate, lo=first_changed)
+        before = segments.slice(0, first_changed)
+        after = segments.slice(after_index, shift=shift)
+    if not len(before) and not len(after) and not identical:
+        return None
+
+    # Cut at segment boundaries so reused and new segments join without overlap
+    duration = new["samples"] / sample_rate
+    start = before.ends[-1] if len(before) else 0.0
+    end = after.starts[0] if len(after) else None
+    if identical:
+        start, end = duration, None
+    reused = start + (duration - end if end is not None else 0.0)
+    return {
+        "start": start,
+        "end": end,
+        "before": before,
+        "after": after,
+        "language": previous.get("language"),
+        "reused_seconds": reused,
+        "unchanged": identical  # Nothing to transcribe, before holds the whole transcript
+    }
@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import time
+import queue
+import platform
+import multiprocessing as mp
+import torch
+import whisper
+import model_store
+from app_paths import app_data_dir
+
+# Finds the best (concurrent jobs x threads per job) split of the CPU for a model.
+# Each trial starts that many worker processes with a fixed torch thread count,
+# lets them all transcribe the same calibration clip at once and measures how many
+# seconds of audio per wall-clock second the host gets through. The winner is stored
+# per host and model size and picked up by the transcription engine.
+
+CALIBRATION_SECONDS = 30
+WARMUP_SECONDS = 5
+MAX_JOBS = 8
+TUNING_FILE = "autotune.json"
+
+# Options used while benchmarking, close to the "balanced" profile but deterministic
+CALIBRATION_OPTIONS = {
+    "task": "transcribe",
+    "temperature": 0.0,
+    "condition_on_previous_text": False,
+    "fp16": False
+}
+
+def host_key():
+    return f"{platform.node()}-{os.cpu_count()}cpu"
+
+def tuning_path():
+    return os.path.join(app_data_dir(), TUNING_FILE)
+
+def _read_tuning():
+    try:
+        with open(tuning_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_config(model):
+    # Best known configuration for this host and model, or None if it was never tuned
+    return _read_tuning().get(host_key(), {}).get(model)
+
+def save_config(model, config):
+    tuning = _read_tuning()
+    tuning.setdefault(host_key(), {})[model] = config
+    tmp_path = f"{tuning_path()}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, tuning_path())
+
+def candidate_configs(cpu_count=None, max_jobs=MAX_JOBS):
+    # Powers of two for the job count, each with the full and half share of cores per job
+    cpu_count = cpu_count or os.cpu_count() or 1
+    configs = []
+    jobs = 1
+    while jobs <= min(cpu_count, max_jobs):
+        share = max(cpu_count // jobs, 1)
+        for threads in sorted({share, max(share // 2, 1)}, reverse=True):
+            configs.append((jobs, threads))
+        jobs *= 2
+    return configs
+
+def _trial_worker(model_name, threads, audio, options, barrier, results):
+    torch.set_num_threads(threads)
+    model = model_store.load_model(model_name)
+    options = dict(options, fp16=options.get("fp16", False) and model.device.type != "cpu")
+
+    # Warm up so one-time costs (page faults on the weights, allocator) aren't timed
+    model.transcribe(audio[:WARMUP_SECONDS * whisper.audio.SAMPLE_RATE], verbose=None, **options)
+
+    barrier.wait()
+    start_time = time.perf_counter()
+    model.transcribe(audio, verbose=None, **options)
+    results.put((start_time, time.perf_counter()))
+
+def run_trial(model, jobs, threads, audio, options=None):
+    # Returns audio seconds transcribed per wall-clock second
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(jobs)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_trial_worker, args=(model, threads, audio, options or CALIBRATION_OPTIONS, barrier, results))
+        for _ in range(jobs)
+    ]
+    for process in processes:
+        process.start()
+
+    timings = []
+    try:
+        while len(timings) < jobs:
+            try:
+                timings.append(results.get(timeout=1))
+            except queue.Empty:
+                # A trial process that died (e.g. out of memory) would leave the others at the barrier
+                crashed = [p for p in processes if p.exitcode not in (None, 0)]
+                if crashed:
+                    raise RuntimeError(f"trial process exited with code {crashed[0].exitcode}")
+    finally:
+        for process in processes:
+            if len(timings) < jobs:
+                process.terminate()
+            process.join()
+
+    wall = max(end for _, end in timings) - min(start for start, _ in timings)
+    return jobs * (len(audio) / whisper.audio.SAMPLE_RATE) / max(wall, 1e-6)
+
+def autotune(model, calibration_file, max_jobs=MAX_JOBS, report=print):
+    # Benchmark every candidate configuration and store the fastest one
+    audio = whisper.load_audio(calibration_file)[:CALIBRATION_SECONDS * whisper.audio.SAMPLE_RATE]
+    # Make sure the model is converted once here instead of in every trial process
+    model_store.load_model(model, device="cpu")
+    model_store.unload_model(model)
+
+    trials = []
+    for jobs, threads in candidate_configs(max_jobs=max_jobs):
+        report(f"Auto-tune {model}: {jobs} job(s) x {threads} thread(s)...")
+        try:
+            throughput = run_trial(model, jobs, threads, audio)
+        except Exception as e:
+            # Usually out of memory with many concurrent jobs, larger job counts won't do better
+            report(f"Auto-tune {model}: {jobs} x {threads} failed ({e})")
+            break
+        trials.append({"jobs": jobs, "threads": threads, "throughput": throughput})
+        report(f"Auto-tune {model}: {jobs} x {threads} -> {throughput:.2f}x realtime")
+
+    if not trials:
+        raise RuntimeError(f"No auto-tune trial succeeded for {model}")
+    best = max(trials, key=lambda trial: trial["throughput"])
+    config = dict(best, trials=trials, calibration_seconds=len(audio) / whisper.audio.SAMPLE_RATE, tuned=time.time())
+    save_config(model, config)
+    report(f"Auto-tune {model}: best is {best['jobs']} job(s) x {best['threads']} thread(s), {best['throughput']:.2f}x realtime")
+    return config
+
+if __name__ == "__main__":
+    # python autotune.py MODEL CALIBRATION_AUDIO [MAX_JOBS]
+    if len(sys.argv) < 3:
+        print("Usage: python autotune.py MODEL CALIBRATION_AUDIO [MAX_JOBS]")
+        sys.exit(1)
+    autotune(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else MAX_JOBS)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from app_paths import app_data_dir
+
+# Incremental checkpoints for long transcriptions. Each job gets an append-only
+# JSON lines file: a header line, then one line per decoded block with its
+# segments and the decode position after it. Lines are fsynced as they are
+# written, so after a crash everything up to the last finished block survives.
+
+HASH_CHUNK = 1024 * 1024
+
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+def audio_hash(file_path):
+    # Content hash of the audio file, cached while the file is unchanged
+    stat = os.stat(file_path)
+    cache_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if cache_key in _hash_cache:
+            return _hash_cache[cache_key]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_cache[cache_key] = value
+    return value
+
+def file_identity(file_path):
+    # Cheap stand-in for audio_hash when only part of a file is decoded: path, size and mtime
+    stat = os.stat(file_path)
+    payload = f"{os.path.abspath(file_path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+    return "file:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def job_key(file_hash, model, options):
+    # Same audio, model and decoding options -> same checkpoint
+    payload = json.dumps({"audio": file_hash, "model": model, "options": options}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def checkpoint_dir():
+    return app_data_dir("checkpoints")
+
+class JobCheckpoint:
+    def __init__(self, key, root=None):
+        self.key = key
+        self.path = os.path.join(root or checkpoint_dir(), f"{key}.jsonl")
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def header(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+
+    def load(self):
+        # Returns the resume state {"seek", "segments", "language", "elapsed"} or None
+        if not self.exists():
+            return None
+        state = {"seek": 0, "segments": [], "language": None, "elapsed": 0.0}
+        with open(self.path, encoding="utf-8") as f:
+            f.readline()  # header
+            for line in f:
+                try:
+                    block = json.loads(line)
+                except ValueError:
+                    break  # Partially written last line from a crash
+                state["seek"] = block["seek"]
+                state["segments"].extend(block["segments"])
+                state["language"] = block["language"] or state["language"]
+                state["elapsed"] = block["elapsed"]
+        return state if state["seek"] else None
+
+    def start(self, header):
+        # Create the file with its header unless we are resuming an existing one
+        if self.exists() and self.header() is not None:
+            return
+        self._write(dict(header, key=self.key, created=time.time()), mode="w")
+
+    def append(self, seek, segments, language, elapsed):
+        self._write({"seek": seek, "segments": segments, "language": language, "elapsed": elapsed})
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, record, mode="a"):
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def unfinished_jobs(root=None):
+    # Headers of checkpoints left behind by jobs that never finished, oldest first.
+    # Checkpoints that are unreadable or whose audio file is gone are deleted.
+    root = root or checkpoint_dir()
+    headers = []
+    for name in os.listdir(root):
+        if not name.endswith(".jsonl"):
+            continue
+        checkpoint = JobCheckpoint(name[:-len(".jsonl")], root)
+        header = checkpoint.header()
+        if header and os.path.exists(header.get("file_path", "")):
+            headers.append(header)
+        else:
+            checkpoint.remove()
+    return sorted(headers, key=lambda header: header.get("created", 0))
+
+def discard(headers, root=None):
+    for header in headers:
+        JobCheckpoint(header["key"], root).remove()
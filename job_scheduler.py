@@ -0,0 +1,116 @@
+import os
+
+# Picks the next pending job for a worker so jobs for the model the worker already
+# holds run back to back instead of reloading weights on nearly every job. Among
+# those, jobs in the language the worker handled last go first. A job's language is
+# only known up front when it was set or cached from an earlier detection.
+# Priority always wins, and a job can only be passed over MAX_BYPASS times before
+# it runs regardless of its model. Models that would not fit in memory next to the
+# ones other workers hold are not loaded.
+
+MAX_BYPASS = 3
+MEMORY_BUDGET_FRACTION = 0.8
+
+# Rough resident memory per loaded model in GB (float32 weights plus working memory).
+# Workers share the mapped weights of the same model, so each model counts once.
+MODEL_MEMORY_GB = {
+    "tiny": 0.5,
+    "base": 0.8,
+    "small": 1.5,
+    "medium": 4.0,
+    "large": 8.0,
+    "turbo": 4.5
+}
+DEFAULT_MODEL_MEMORY_GB = 8.0
+
+def total_memory_gb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        return None  # Not available on Windows, memory checks are skipped there
+
+def model_memory_gb(model):
+    return MODEL_MEMORY_GB.get(model, DEFAULT_MODEL_MEMORY_GB)
+
+class ModelScheduler:
+    def __init__(self, memory_budget_gb=None, max_bypass=MAX_BYPASS):
+        if memory_budget_gb is None:
+            total = total_memory_gb()
+            memory_budget_gb = total * MEMORY_BUDGET_FRACTION if total else None
+        self.memory_budget_gb = memory_budget_gb
+        self.max_bypass = max_bypass
+        self.model_loads = 0
+        self.picked = []  # (priority, id, model) of every job handed to a worker, to compare against FIFO
+
+    def fits(self, model, resident_models):
+        # Would loading model next to the models other workers hold stay within the budget?
+        resident = set(resident_models)
+        if self.memory_budget_gb is None or not resident or model in resident:
+            return True
+        return sum(model_memory_gb(m) for m in resident | {model}) <= self.memory_budget_gb
+
+    def _choose(self, jobs, preferred_models, resident_models=(), preferred_languages=(), count_bypass=True):
+        if not jobs:
+            return None
+        top = max(job.priority for job in jobs)
+        candidates = sorted((job for job in jobs if job.priority == top), key=lambda job: job.id)
+
+        fitting = [job for job in candidates if self.fits(job.model, resident_models)]
+        if not fitting:
+            return None
+        overdue = [job for job in fitting if job.bypassed >= self.max_bypass]
+        same_model = [job for job in fitting if job.model in preferred_models]
+        group = overdue or same_model or fitting
+        same_language = [job for job in group if job.language and job.language in preferred_languages]
+        choice = group[0] if overdue else (same_language or group)[0]
+
+        # Everything older that was skipped gets one step closer to running no matter what
+        if count_bypass:
+            for job in candidates:
+                if job.id < choice.id:
+                    job.bypassed += 1
+        return choice
+
+    def pick_to_prepare(self, waiting, models, languages=()):
+        # Which queued job to decode next: one for a model the workers hold or are
+        # about to load, so the jobs pick() wants are the ones already decoded. Skips
+        # are only counted by pick(), so each one counts once towards MAX_BYPASS.
+        return self._choose(waiting, set(models), preferred_languages=set(languages), count_bypass=False)
+
+    def pick(self, pending, worker_model, resident_models=(), worker_language=None, waiting=()):
+        # Choose the job a worker holding worker_model should run next, or None if
+        # nothing can be loaded until another worker frees its memory. Older jobs
+        # still waiting to be prepared count as skipped too, so decode ordering
+        # can't starve them.
+        if not pending:
+            return None
+        choice = self._choose(pending, {worker_model}, resident_models, {worker_language})
+        if choice is None:
+            return None
+        for job in waiting:
+            if job.priority == choice.priority and job.id < choice.id:
+                job.bypassed += 1
+
+        if choice.model != worker_model:
+            self.model_loads += 1
+        self.picked.append((choice.priority, choice.id, choice.model))
+        return choice
+
+    def fifo_loads(self, workers=1):
+        # Model loads plain FIFO would have needed for the same jobs: highest priority
+        # first, oldest first within a priority, each job going to the next worker in turn
+        loaded = [None] * max(workers, 1)
+        loads = 0
+        for i, (_, _, model) in enumerate(sorted(self.picked, key=lambda p: (-p[0], p[1]))):
+            if loaded[i % len(loaded)] != model:
+                loaded[i % len(loaded)] = model
+                loads += 1
+        return loads
+
+    def stats(self, workers=1):
+        fifo_loads = self.fifo_loads(workers)
+        return {
+            "model_loads": self.model_loads,
+            "fifo_loads": fifo_loads,
+            "loads_avoided": max(fifo_loads - self.model_loads, 0)
+        }
@@ -0,0 +1,103 @@
+import os
+import json
+import threading
+import numpy as np
+import torch
+import whisper
+from app_paths import app_data_dir
+
+# Spoken language identification ahead of transcription. Instead of letting Whisper
+# guess from the first 30 seconds (often an intro jingle or silence), a few short
+# windows are taken from different parts of the file and run through the model in
+# one batch. Loudness only picks the candidate windows: the same forward pass gives
+# each window's no-speech probability, and every window's language vote is weighted
+# by how likely it holds speech, so a loud music bed doesn't decide the language.
+# The answer is cached by audio content hash, so the same file is never detected
+# twice and jobs can be grouped by language.
+
+WINDOW_SECONDS = 8
+WINDOW_COUNT = 3
+MIN_RMS = 0.005  # Windows quieter than this (about -46 dBFS) are treated as silence
+MIN_CONFIDENCE = 0.5  # Below this Whisper's own detection is used and nothing is cached
+MIN_SPEECH = 0.5  # Windows must hold at least half a window's worth of speech between them
+CACHE_FILE = "languages.json"
+
+_cache_lock = threading.Lock()
+
+def speech_windows(audio, sample_rate, count=WINDOW_COUNT, seconds=WINDOW_SECONDS):
+    # (start, end) sample ranges of the loudest stretch in each of count equal parts of
+    # the audio. These are only candidates, detect_language checks they hold speech.
+    total_seconds = len(audio) // sample_rate
+    if total_seconds <= seconds:
+        return [(0, len(audio))]
+    frames = audio[:total_seconds * sample_rate].reshape(total_seconds, sample_rate)
+    rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / sample_rate)
+    window_rms = np.convolve(rms, np.ones(seconds) / seconds, mode="valid")
+
+    windows = []
+    for part in np.array_split(np.arange(len(window_rms)), min(count, len(window_rms))):
+        best = int(part[np.argmax(window_rms[part])])
+        # The loudest stretch can sit on the border of two parts, don't take it twice
+        overlaps = windows and best * sample_rate < windows[-1][1]
+        if window_rms[best] >= MIN_RMS and not overlaps:
+            windows.append((best * sample_rate, (best + seconds) * sample_rate))
+    return windows
+
+def detect_language(model, audio, sample_rate=whisper.audio.SAMPLE_RATE):
+    # Returns (language code, confidence) or (None, 0.0) when the audio gives no clear answer
+    if not model.is_multilingual:
+        return None, 0.0  # English-only models have no language head to ask
+    windows = speech_windows(audio, sample_rate)
+    if not windows:
+        return None, 0.0
+
+    dtype = next(model.parameters()).dtype
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(np.ascontiguousarray(audio[start:end])), model.dims.n_mels)
+        for start, end in windows
+    ]).to(model.device, dtype)
+    tokenizer = whisper.tokenizer.get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+    with torch.no_grad():
+        # Logits at the start-of-transcript token hold both the language and the no-speech prediction
+        tokens = torch.tensor([[tokenizer.sot]] * len(windows), device=model.device)
+        logits = model.logits(tokens, model.embed_audio(mel))[:, 0].float()
+    no_speech = logits.softmax(dim=-1)[:, tokenizer.no_speech].tolist()
+    language_probs = logits[:, list(tokenizer.all_language_tokens)].softmax(dim=-1).tolist()
+
+    # Confidence vote: every window adds its language distribution, weighted by its chance of being speech
+    totals = {}
+    for p_no_speech, window_probs in zip(no_speech, language_probs):
+        for language, p in zip(tokenizer.all_language_codes, window_probs):
+            totals[language] = totals.get(language, 0.0) + (1 - p_no_speech) * p
+    speech = sum(1 - p for p in no_speech)
+    if speech < MIN_SPEECH:
+        return None, 0.0
+    language = max(totals, key=totals.get)
+    confidence = totals[language] / speech
+    if confidence < MIN_CONFIDENCE:
+        return None, confidence
+    return language, confidence
+
+def cache_path():
+    return os.path.join(app_data_dir(), CACHE_FILE)
+
+def _read_cache():
+    try:
+        with open(cache_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def cached_language(audio_hash):
+    with _cache_lock:
+        entry = _read_cache().get(audio_hash)
+    return entry["language"] if entry else None
+
+def cache_language(audio_hash, language, confidence, model=None):
+    with _cache_lock:
+        cache = _read_cache()
+        cache[audio_hash] = {"language": language, "confidence": round(confidence, 3), "model": model}
+        tmp_path = f"{cache_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path())
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import threading
+import torch
+import whisper
+
+try:
+    import certifi
+except ImportError:
+    certifi = None  # Downloads then use the system CA store
+from whisper.model import ModelDimensions, Whisper
+
+# Local model store: every checkpoint is converted once into a flat float32 file
+# plus a small JSON index. Loading maps that file read-only (copy-on-write), so all
+# worker processes using the same model share the same physical pages, and nothing
+# is downloaded when the store already has the model.
+
+STORE_VERSION = 1
+WEIGHTS_FILE = "weights.f32"
+META_FILE = "meta.json"
+ALIGNMENT = 16  # Elements, keeps every tensor 64-byte aligned inside the file
+
+_loaded_models = {}
+_load_lock = threading.Lock()
+
+def default_download_root():
+    # Same location whisper.load_model uses
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "whisper")
+
+def default_store_root():
+    return os.getenv("WHISPER_GUI_MODEL_STORE", os.path.join(default_download_root(), "store"))
+
+def is_offline():
+    # Air-gapped hosts set this so a missing model fails fast instead of trying the network
+    return os.getenv("WHISPER_GUI_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+def store_path(name, store_root=None):
+    return os.path.join(store_root or default_store_root(), name)
+
+def store_name(name):
+    # Custom checkpoints passed by path are stored under their file name
+    return os.path.splitext(os.path.basename(name))[0] if os.path.isfile(name) else name
+
+def has_model(name, store_root=None):
+    path = store_path(name, store_root)
+    return os.path.exists(os.path.join(path, META_FILE)) and os.path.exists(os.path.join(path, WEIGHTS_FILE))
+
+def find_checkpoint(name, download_root=None, offline=None):
+    # Return the path of the original .pt checkpoint, downloading it only if allowed
+    if os.path.isfile(name):
+        return name
+    if name not in whisper._MODELS:
+        raise RuntimeError(f"Model {name} not found; available models = {whisper.available_models()}")
+
+    download_root = download_root or default_download_root()
+    url = whisper._MODELS[name]
+    checkpoint_path = os.path.join(download_root, os.path.basename(url))
+    if offline is None:
+        offline = is_offline()
+    if offline and not os.path.isfile(checkpoint_path):
+        raise RuntimeError(
+            f"Model {name} is not in the local store and {checkpoint_path} does not exist. "
+            f"Copy the checkpoint there (or a converted store into {store_path(name)}) and try again."
+        )
+    # whisper._download verifies the checksum and only touches the network if the file is missing or corrupt
+    if certifi is None or os.environ.get("SSL_CERT_FILE") or os.path.isfile(checkpoint_path):
+        return whisper._download(url, download_root, False)
+    # Some Python installs (e.g. python.org builds on macOS) ship without CA certificates,
+    # point OpenSSL at certifi's bundle for this download only
+    os.environ["SSL_CERT_FILE"] = certifi.where()
+    try:
+        return whisper._download(url, download_root, False)
+    finally:
+        del os.environ["SSL_CERT_FILE"]
+
+def convert_checkpoint(name, checkpoint_path, store_root=None):
+    # Write the checkpoint as one float32 blob, done once per model
+    path = store_path(name, store_root)
+    os.makedirs(path, exist_ok=True)
+
+    with open(checkpoint_path, "rb") as f:
+        checkpoint = torch.load(f, map_location="cpu")
+
+    tensors = []
+    offset = 0
+    tmp_weights = os.path.join(path, f"{WEIGHTS_FILE}.{os.getpid()}.tmp")
+    with open(tmp_weights, "wb") as f:
+        for key, tensor in checkpoint["model_state_dict"].items():
+            # Stored as float32 so the mapped tensors can be used on CPU without a copy
+            data = tensor.detach().to(torch.float32).contiguous()
+            padding = (-offset) % ALIGNMENT
+            if padding:
+                f.write(b"\0" * (padding * 4))
+                offset += padding
+            f.write(data.numpy().tobytes())
+            tensors.append({"name": key, "offset": offset, "shape": list(data.shape)})
+            offset += data.numel()
+
+    meta = {
+        "version": STORE_VERSION,
+        "name": name,
+        "dims": checkpoint["dims"],
+        "numel": offset,
+        "tensors": tensors
+    }
+    tmp_meta = os.path.join(path, f"{META_FILE}.{os.getpid()}.tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+
+    # Several workers may convert at the same time, the renames keep the store consistent
+    os.replace(tmp_weights, os.path.join(path, WEIGHTS_FILE))
+    os.replace(tmp_meta, os.path.join(path, META_FILE))
+    print(f"Converted {checkpoint_path} into model store at {path}")
+    return path
+
+def _materialize_buffers(model, name):
+    # Non-persistent buffers are not in the checkpoint, build them on CPU
+    n_ctx = model.dims.n_text_ctx
+    mask = torch.empty(n_ctx, n_ctx).fill_(-float("inf")).triu_(1)
+    model.decoder.register_buffer("mask", mask, persistent=False)
+
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+    else:
+        # Same default as Whisper.__init__: use the last half of the decoder layers
+        all_heads = torch.zeros(model.dims.n_text_layer, model.dims.n_text_head, dtype=torch.bool)
+        all_heads[model.dims.n_text_layer // 2:] = True
+        model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+
+def map_model(name, store_root=None):
+    # Build a Whisper model whose weights are views into the mapped store file
+    path = store_path(name, store_root)
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("version") != STORE_VERSION:
+        raise RuntimeError(f"Model store at {path} has an unsupported version, delete it to reconvert")
+
+    # shared=False maps the file copy-on-write: pages are shared between processes until written
+    flat = torch.from_file(os.path.join(path, WEIGHTS_FILE), shared=False, size=meta["numel"], dtype=torch.float32)
+    state_dict = {}
+    for entry in meta["tensors"]:
+        numel = 1
+        for size in entry["shape"]:
+            numel *= size
+        state_dict[entry["name"]] = flat[entry["offset"]:entry["offset"] + numel].view(entry["shape"])
+
+    dims = ModelDimensions(**meta["dims"])
+    try:
+        # Skip allocating and initializing weights that are replaced right away
+        with torch.device("meta"):
+            model = Whisper(dims)
+        model.load_state_dict(state_dict, assign=True)
+    except (TypeError, NotImplementedError, RuntimeError):
+        # Older torch builds lack assign=True or meta support, fall back to copying into a regular model
+        model = Whisper(dims)
+        model.load_state_dict(state_dict)
+    _materialize_buffers(model, name)
+    return model
+
+def load_model(name, device=None, download_root=None, store_root=None, offline=None):
+    # Drop-in replacement for whisper.load_model backed by the local store
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    key = (name, str(device), store_root)
+    with _load_lock:
+        if key in _loaded_models:
+            return _loaded_models[key]
+
+        name_in_store = store_name(name)
+        if not has_model(name_in_store, store_root):
+            checkpoint_path = find_checkpoint(name, download_root, offline)
+            convert_checkpoint(name_in_store, checkpoint_path, store_root)
+
+        model = map_model(name_in_store, store_root)
+        if str(device) != "cpu":
+            # GPU memory can't be mapped from disk, this is a regular copy
+            model = model.to(device)
+        model.eval()
+        _loaded_models[key] = model
+        return model
+
+def loaded_models():
+    # Names of the models cached in this process
+    with _load_lock:
+        return sorted({key[0] for key in _loaded_models})
+
+def unload_model(name=None):
+    # Forget cached models (all of them if no name is given)
+    with _load_lock:
+        for key in list(_loaded_models):
+            if name is None or key[0] == name:
+                del _loaded_models[key]
+
+if __name__ == "__main__":
+    # Pre-convert models, e.g. before copying the store to air-gapped hosts:
+    #   python model_store.py tiny base small
+    for model_name in sys.argv[1:] or ["base"]:
+        convert_checkpoint(store_name(model_name), find_checkpoint(model_name))
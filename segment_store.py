@@ -0,0 +1,202 @@
+import io
+import sys
+import json
+import random
+import tracemalloc
+from array import array
+
+# Compact storage for transcript segments. model.transcribe returns one dict per
+# segment with its token ids, probabilities and a separate text string; for a
+# multi-hour file that adds up to a lot of small Python objects. Here a transcript
+# is three flat columns (start, end, offset into the text) plus one UTF-8 buffer
+# holding all segment texts back to back, so the full text is a single decode and
+# exporters stream segment by segment without building anything in between.
+
+class SegmentStore:
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.offsets = array("Q", [0])  # Segment i is text[offsets[i]:offsets[i + 1]]
+        self.text = bytearray()
+
+    @classmethod
+    def from_segments(cls, segments):
+        # Accepts Whisper segment dicts, {"start", "end", "text"} dicts or another store
+        store = cls()
+        store.extend(segments)
+        return store
+
+    def append(self, start, end, text):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.text += text.encode("utf-8")
+        self.offsets.append(len(self.text))
+
+    def extend(self, segments, shift=0.0):
+        if isinstance(segments, SegmentStore):
+            for start, end, text in segments.rows():
+                self.append(start + shift, end + shift, text)
+            return
+        for segment in segments:
+            self.append(segment["start"] + shift, segment["end"] + shift, segment["text"])
+
+    def slice(self, first, last=None, shift=0.0):
+        # New store with segments first..last-1, timestamps moved by shift
+        store = SegmentStore()
+        for i in range(*slice(first, last).indices(len(self))):
+            store.append(self.starts[i] + shift, self.ends[i] + shift, self.segment_text(i))
+        return store
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __add__(self, other):
+        store = self.slice(0)
+        store.extend(other)
+        return store
+
+    def segment_text(self, i):
+        return self.text[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("segment index out of range")
+        return {"start": self.starts[i], "end": self.ends[i], "text": self.segment_text(i)}
+
+    def rows(self):
+        # (start, end, text) tuples, the cheapest way to walk a transcript
+        for i in range(len(self)):
+            yield self.starts[i], self.ends[i], self.segment_text(i)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def last(self, count):
+        return [self[i] for i in range(max(len(self) - count, 0), len(self))]
+
+    def full_text(self):
+        return self.text.decode("utf-8")
+
+    def nbytes(self):
+        return sum(sys.getsizeof(column) for column in (self.starts, self.ends, self.offsets, self.text))
+
+    def to_json(self):
+        # Columnar form for JSON caches
+        return {
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "offsets": self.offsets.tolist(),
+            "text": self.full_text()
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        store = cls()
+        store.starts.extend(data["starts"])
+        store.ends.extend(data["ends"])
+        store.offsets = array("Q", data["offsets"])
+        store.text = bytearray(data["text"].encode("utf-8"))
+        return store
+
+# Exporters, each writes one segment at a time to an open text file
+
+def format_srt_time(seconds, separator=","):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms % 3600000 // 60000:02d}:{ms % 60000 // 1000:02d}{separator}{ms % 1000:03d}"
+
+def write_txt(store, f):
+    for _, _, text in store.rows():
+        f.write(text.strip() + "\n")
+
+def write_srt(store, f):
+    for i, (start, end, text) in enumerate(store.rows(), 1):
+        f.write(f"{i}\n{format_srt_time(start)} --> {format_srt_time(end)}\n{text.strip()}\n\n")
+
+def write_vtt(store, f):
+    f.write("WEBVTT\n\n")
+    for start, end, text in store.rows():
+        f.write(f"{format_srt_time(start, '.')} --> {format_srt_time(end, '.')}\n{text.strip()}\n\n")
+
+def write_json(store, f, **metadata):
+    # Same shape as Whisper's JSON output: {"text", "segments": [...], ...metadata}
+    f.write("{")
+    for key, value in metadata.items():
+        f.write(f"{json.dumps(key)}: {json.dumps(value)}, ")
+    # The text value is written one segment at a time, the escaped pieces concatenate to the full string
+    f.write('"text": "')
+    for _, _, text in store.rows():
+        f.write(json.dumps(text, ensure_ascii=False)[1:-1])
+    f.write('", "segments": [')
+    for i, (start, end, text) in enumerate(store.rows()):
+        if i:
+            f.write(", ")
+        f.write(json.dumps({"id": i, "start": round(start, 3), "end": round(end, 3), "text": text}, ensure_ascii=False))
+    f.write("]}\n")
+
+EXPORTERS = {
+    ".txt": write_txt,
+    ".srt": write_srt,
+    ".vtt": write_vtt,
+    ".json": write_json
+}
+
+def export(store, path, **metadata):
+    # Format is picked from the file extension
+    extension = path[path.rfind("."):].lower() if "." in path else ".txt"
+    writer = EXPORTERS.get(extension)
+    if writer is None:
+        raise ValueError(f"Unsupported export format: {extension}")
+    with open(path, "w", encoding="utf-8", buffering=io.DEFAULT_BUFFER_SIZE * 16) as f:
+        if writer is write_json:
+            writer(store, f, **metadata)
+        else:
+            writer(store, f)
+
+def _whisper_like_segments(hours):
+    # Synthetic segments shaped like model.transcribe output, about one every 4 seconds
+    rng = random.Random(0)
+    words = "the of and to a in that is was he for it with as his on be at by i this had not are but".split()
+    segments = []
+    t = 0.0
+    while t < hours * 3600:
+        length = rng.uniform(2.0, 6.0)
+        text = " " + " ".join(rng.choice(words) for _ in range(int(length * 2.5)))
+        segments.append({
+            "id": len(segments),
+            "seek": int(t * 100) // 3000 * 3000,
+            "start": t,
+            "end": t + length,
+            "text": text,
+            "tokens": [rng.randrange(50257) for _ in range(int(length * 4))],
+            "temperature": 0.0,
+            "avg_logprob": -rng.random(),
+            "compression_ratio": 1.0 + rng.random(),
+            "no_speech_prob": rng.random()
+        })
+        t += length
+    return segments
+
+def measure(hours=1.0):
+    # Memory per transcript as Whisper segment dicts plus joined text versus a SegmentStore
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    segments = _whisper_like_segments(hours)
+    text = "".join(segment["text"] for segment in segments)
+    as_dicts = tracemalloc.get_traced_memory()[0] - base
+
+    base = tracemalloc.get_traced_memory()[0]
+    store = SegmentStore.from_segments(segments)
+    as_store = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del text
+    return len(store), as_dicts, as_store
+
+if __name__ == "__main__":
+    # python segment_store.py [HOURS]
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    count, as_dicts, as_store = measure(hours)
+    print(f"{count} segments ({hours:g} h)")
+    print(f"Whisper segment dicts + text: {as_dicts / 1024:.0f} KiB")
+    print(f"SegmentStore:                 {as_store / 1024:.0f} KiB ({as_dicts / max(as_store, 1):.0f}x smaller)")
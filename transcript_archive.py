@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+from app_paths import app_data_dir
+from segment_store import SegmentStore
+
+# Local archive of every finished transcript. Segments are stored with their
+# timestamps in SQLite and indexed with FTS5, so a search over years of
+# transcripts returns matching segments in milliseconds.
+
+ARCHIVE_FILE = "archive.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    model TEXT,
+    profile TEXT,
+    language TEXT,
+    duration REAL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    transcript_id INTEGER NOT NULL REFERENCES transcripts(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_by_transcript ON segments(transcript_id, idx);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text,
+    content='segments',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def fts_query(text):
+    # Quote every word so user input can't break the FTS syntax; prefix-match the last one
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+class TranscriptArchive:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(app_data_dir(), ARCHIVE_FILE)
+        self.lock = threading.Lock()
+        # Shared between the engine thread (writes) and the Tk thread (searches)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(SCHEMA)
+
+    def add_transcript(self, file_path, segments, model=None, profile=None, language=None, duration=None):
+        # Store a finished transcript and index its segments, returns the transcript id
+        if not isinstance(segments, SegmentStore):
+            segments = SegmentStore.from_segments(segments)
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO transcripts (file_path, file_name, model, profile, language, duration, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_path, os.path.basename(file_path), model, profile, language, duration, time.time())
+            )
+            transcript_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO segments (transcript_id, idx, start, end, text) VALUES (?, ?, ?, ?, ?)",
+                ((transcript_id, i, start, end, text.strip()) for i, (start, end, text) in enumerate(segments.rows()))
+            )
+            self.conn.execute(
+                "INSERT INTO segments_fts (rowid, text) SELECT id, text FROM segments WHERE transcript_id = ?",
+                (transcript_id,)
+            )
+        return transcript_id
+
+    def delete_transcript(self, transcript_id):
+        with self.lock, self.conn:
+            # External content FTS tables need the old values to remove index entries
+            self.conn.execute(
+                "INSERT INTO segments_fts (segments_fts, rowid, text) "
+                "SELECT 'delete', id, text FROM segments WHERE transcript_id = ?",
+                (transcript_id,)
+            )
+            self.conn.execute("DELETE FROM transcripts WHERE id = ?", (transcript_id,))
+
+    def search(self, text, limit=100):
+        # Best matching segments first, each with its file, model and timestamps
+        query = fts_query(text)
+        if query is None:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT s.id AS segment_id, s.transcript_id, s.idx, s.start, s.end, s.text, "
+                "t.file_path, t.file_name, t.model, "
+                "snippet(segments_fts, 0, '[', ']', '…', 12) AS snippet "
+                "FROM segments_fts "
+                "JOIN segments s ON s.id = segments_fts.rowid "
+                "JOIN transcripts t ON t.id = s.transcript_id "
+                "WHERE segments_fts MATCH ? "
+                "ORDER BY rank LIMIT ?",
+                (query, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def transcript(self, transcript_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM transcripts WHERE id = ?", (transcript_id,)).fetchone()
+        return dict(row) if row else None
+
+    def segments(self, transcript_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, idx, start, end, text FROM segments WHERE transcript_id = ? ORDER BY idx",
+                (transcript_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+if __name__ == "__main__":
+    # python transcript_archive.py "search words"
+    archive = TranscriptArchive()
+    start_time = time.perf_counter()
+    hits = archive.search(" ".join(sys.argv[1:]))
+    elapsed = (time.perf_counter() - start_time) * 1000
+    for hit in hits:
+        print(f"{hit['file_name']} [{format_timestamp(hit['start'])}] {hit['snippet']}")
+    print(f"{len(hits)} match(es) in {elapsed:.1f} ms")
@@ -0,0 +1,1003 @@
+import gc
+import os
+import sys
+import time
+import argparse
+import contextlib
+import subprocess
+import queue
+import itertools
+import threading
+import collections
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import torch
+import whisper
+import model_store
+import job_checkpoints
+import autotune
+import audio_versions
+import language_id
+from job_scheduler import ModelScheduler
+from segment_store import SegmentStore
+
+# Background transcription engine. Jobs run in worker processes and are decoded in
+# blocks of a few Whisper windows; between blocks a worker checks its control flag,
+# so a job can be cancelled or preempted (and later resumed) at a block boundary.
+# Every finished block is also checkpointed to disk, so restarting the same job
+# after a crash picks up where it stopped. When the host was auto-tuned for a model,
+# the engine runs that many workers with the tuned torch thread count each.
+# Pending jobs are ordered by a model-aware scheduler so workers keep their model
+# loaded across consecutive jobs. When a file was transcribed before and has since
+# been edited, only the changed part is transcribed again (see audio_versions.py).
+# Without a language set, it is identified once per file from a few speech windows
+# and cached (see language_id.py).
+#
+# Each job goes through a staged pipeline connected by bounded queues:
+#   probe (hash, checkpoint key) -> decode (ffmpeg into shared memory)
+#   -> features (per-second peak levels, chunk hashes) -> inference (worker process) -> output (archive)
+# so the next file is decoded while the current one is being transcribed. Decoded
+# audio reaches the worker processes through shared memory instead of being pickled.
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+BLOCK_SECONDS = 60  # Two Whisper windows, the longest a cancel or preemption has to wait
+PROMPT_SEGMENTS = 5  # Segments of previous text used to condition the next block
+DECODE_AHEAD = 2  # Decoded jobs allowed to wait for a worker, bounds the memory held by decoded audio
+OUTPUT_QUEUE_SIZE = 8
+SILENCE_PEAK = 1e-4  # About -80 dBFS, blocks entirely below this are digital silence and skipped
+PIPELINE_STAGES = ("probe", "decode", "features", "inference", "output")
+
+# Worker control flag values
+RUN = 0
+CANCEL = 1
+PREEMPT = 2
+
+PRIORITY_NORMAL = 0
+PRIORITY_URGENT = 10
+
+# Decoding profiles passed straight through to model.transcribe.
+# "fp16" only takes effect when the model runs on a GPU.
+DECODING_PROFILES = {
+    "fastest": {
+        "description": "Greedy decoding, no temperature fallback, no conditioning",
+        "task": "transcribe",
+        "beam_size": None,
+        "best_of": None,
+        "temperature": 0.0,
+        "condition_on_previous_text": False,
+        "fp16": True
+    },
+    "balanced": {
+        "description": "Greedy decoding with a short temperature fallback",
+        "task": "transcribe",
+        "beam_size": None,
+        "best_of": 3,
+        "temperature": (0.0, 0.4, 0.8),
+        "condition_on_previous_text": True,
+        "fp16": True
+    },
+    "accurate": {
+        "description": "Beam search with the full Whisper fallback schedule",
+        "task": "transcribe",
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "condition_on_previous_text": True,
+        "fp16": False
+    }
+}
+
+def build_transcribe_options(profile, language=None, device="cpu"):
+    # Turn a profile name into keyword arguments for model.transcribe
+    options = dict(DECODING_PROFILES[profile])
+    options.pop("description")
+    options["language"] = language
+    # Whisper only supports fp16 on GPU, trying it on CPU just logs a warning and falls back
+    options["fp16"] = options["fp16"] and device != "cpu"
+    return options
+
+def parse_timestamp(text):
+    # "1:02:03", "42:00" or "90" -> seconds, empty -> None
+    text = (text or "").strip()
+    if not text:
+        return None
+    seconds = 0.0
+    for part in text.split(":"):
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(f"Negative time: {text}")
+    return seconds
+
+def _decode_pcm(file_path, start=None, end=None, sr=SAMPLE_RATE):
+    # Run ffmpeg and return raw 16-bit mono PCM. It seeks to start and stops at end,
+    # so only that part of the file is decoded.
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0"]
+    if start:
+        # -ss before -i seeks in the input instead of decoding and discarding everything before it
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", file_path]
+    if end is not None:
+        cmd += ["-t", f"{end - (start or 0):.3f}"]
+    cmd += ["-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-"]
+    try:
+        return subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+
+class SharedAudio:
+    # Decoded audio in a shared memory block owned by the engine process.
+    # Workers attach to it by name instead of receiving a pickled copy.
+    def __init__(self, shm, samples):
+        self.shm = shm
+        self.samples = samples
+
+    @classmethod
+    def decode(cls, file_path, start=None, end=None):
+        pcm = _decode_pcm(file_path, start, end)
+        samples = len(pcm) // 2
+        shm = shared_memory.SharedMemory(create=True, size=max(samples * 4, 1))
+        array = np.ndarray((samples,), np.float32, buffer=shm.buf)
+        # Convert straight into shared memory, no intermediate float copy
+        np.divide(np.frombuffer(pcm, np.int16, count=samples), 32768.0, out=array, casting="unsafe")
+        del array
+        return cls(shm, samples)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def array(self):
+        return np.ndarray((self.samples,), np.float32, buffer=self.shm.buf)
+
+    def release(self):
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A view is still alive, the mapping goes with it, but the name is removed below
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+@contextlib.contextmanager
+def attach_shared_audio(name, samples):
+    # Worker side view of a SharedAudio block
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument. Workers are spawned from the engine
+        # process and share its resource tracker, so attaching doesn't unlink anything.
+        shm = shared_memory.SharedMemory(name=name)
+    try:
+        yield np.ndarray((samples,), np.float32, buffer=shm.buf)
+    finally:
+        gc.collect()  # Slices of the array handed to torch must be gone before closing
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+def peak_levels(audio):
+    # Peak amplitude of every second of audio, used to skip digital silence
+    # Whole seconds are reduced through a view, so no copy of the audio is made
+    whole = len(audio) // SAMPLE_RATE
+    frames = audio[:whole * SAMPLE_RATE].reshape(whole, SAMPLE_RATE)
+    peaks = np.maximum(frames.max(axis=1), -frames.min(axis=1)) if whole else np.zeros(0, np.float32)
+    rest = audio[whole * SAMPLE_RATE:]
+    if len(rest):
+        peaks = np.append(peaks, max(rest.max(), -rest.min()))
+    return peaks
+
+class PipelineStats:
+    # Busy time per pipeline stage, to see which stage limits throughput. Figures cover
+    # the current batch: the first stage to start after the engine went idle resets them.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = None
+        self.ended = None  # When the last batch drained, the wall time stops there
+        self.busy = {stage: 0.0 for stage in PIPELINE_STAGES}
+        self.items = {stage: 0 for stage in PIPELINE_STAGES}
+
+    def begin(self):
+        with self.lock:
+            if self.started is None or self.ended is not None:
+                self.started = time.perf_counter()
+                self.ended = None
+                self.busy = dict.fromkeys(PIPELINE_STAGES, 0.0)
+                self.items = dict.fromkeys(PIPELINE_STAGES, 0)
+
+    def idle(self):
+        with self.lock:
+            if self.started is not None and self.ended is None:
+                self.ended = time.perf_counter()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.busy[stage] += seconds
+            self.items[stage] += 1
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        self.begin()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+    def report(self, inference_slots=1):
+        # Utilization is busy time over the batch's wall time; inference has one slot per worker
+        with self.lock:
+            if self.started is None:
+                wall = 1e-6
+            else:
+                wall = max((self.ended or time.perf_counter()) - self.started, 1e-6)
+            return {
+                stage: {
+                    "busy": self.busy[stage],
+                    "items": self.items[stage],
+                    "utilization": self.busy[stage] / (wall * (inference_slots if stage == "inference" else 1))
+                }
+                for stage in PIPELINE_STAGES
+            }
+
+def format_pipeline_stats(stats):
+    return " · ".join(f"{stage} {stats[stage]['utilization']:.0%}" for stage in PIPELINE_STAGES)
+
+class JobCancelled(Exception):
+    pass
+
+class JobPreempted(Exception):
+    def __init__(self, state):
+        super().__init__("preempted")
+        self.state = state
+
+_job_ids = itertools.count(1)
+
+class Job:
+    def __init__(self, file_path, model, options, priority=PRIORITY_NORMAL, profile=None, start=None, end=None):
+        self.id = next(_job_ids)
+        self.file_path = file_path
+        self.start = start  # Optional time range in seconds, None means from the beginning / to the end
+        self.end = end
+        self.model = model
+        self.options = options
+        self.priority = priority
+        self.profile = profile
+        self.language = options.get("language")  # Set or cached language, used to group jobs
+        self.threads = None  # torch intra-op threads, None leaves torch's default
+        self.bypassed = 0  # How often the scheduler let a younger job go first
+        self.audio_hash = None
+        self.checkpoint_key = None
+        self.audio = None  # SharedAudio once decoded
+        self.peaks = None
+        self.fingerprint = None  # Chunk hashes of the decoded audio
+        self.update = None  # Part to transcribe again when an earlier version was transcribed
+        self.run_started = None
+        self.state = "probing"
+        self.progress = 0.0
+        self.resume = None  # Decode position and segments saved when the job was preempted
+        self.result = None
+        self.error = None
+        self.worker = None
+        self.submitted = time.time()
+
+    def to_task(self):
+        # Plain dict sent to the worker process
+        return {
+            "id": self.id,
+            "file_path": self.file_path,
+            "model": self.model,
+            "options": self.options,
+            "profile": self.profile,
+            "priority": self.priority,
+            "threads": self.threads,
+            "start": self.start,
+            "end": self.end,
+            "checkpoint_key": self.checkpoint_key,
+            "language": self.language,
+            "audio": (self.audio.name, self.audio.samples),
+            "peaks": self.peaks,
+            "update": self.update,
+            "resume": self.resume
+        }
+
+def prompt_from_segments(segments):
+    # Rebuild the conditioning text Whisper would have carried over from previous windows
+    return "".join(segment["text"] for segment in list(segments)[-PROMPT_SEGMENTS:]).strip() or None
+
+def transcribe_blocks(model, audio, options, seek=0, segments=None, peaks=None):
+    # Transcribe audio block by block, yielding (new_segments, next_seek, language).
+    # The last segment of a block that does not reach the end of the audio is dropped
+    # and decoded again with the next block, like Whisper does at window boundaries.
+    # With per-second peaks, blocks of pure digital silence are skipped.
+    options = dict(options)
+    condition = options.get("condition_on_previous_text", True)
+    # Only the last few segments are needed for the prompt
+    if isinstance(segments, SegmentStore):
+        segments = segments.last(PROMPT_SEGMENTS)
+    previous = collections.deque(segments or [], maxlen=PROMPT_SEGMENTS)
+    total = len(audio)
+    block = BLOCK_SECONDS * SAMPLE_RATE
+
+    while seek < total:
+        end = min(seek + block, total)
+        if peaks is not None and peaks[seek // SAMPLE_RATE:-(-end // SAMPLE_RATE)].max(initial=0.0) < SILENCE_PEAK:
+            yield [], end, options.get("language")
+            seek = end
+            continue
+
+        prompt = prompt_from_segments(previous) if condition else None
+        result = model.transcribe(audio[seek:end], initial_prompt=prompt, verbose=None, **options)
+
+        block_segments = result["segments"]
+        next_seek = end
+        if end < total and len(block_segments) > 1:
+            cut_start = seek + int(block_segments[-1]["start"] * SAMPLE_RATE)
+            if cut_start > seek:
+                block_segments = block_segments[:-1]
+                next_seek = cut_start
+
+        offset = seek / SAMPLE_RATE
+        new_segments = [
+            {"start": s["start"] + offset, "end": s["end"] + offset, "text": s["text"]}
+            for s in block_segments
+        ]
+        previous.extend(new_segments)
+
+        # Detect the language once, then keep it fixed for the remaining blocks
+        if options.get("language") is None:
+            options["language"] = result.get("language")
+
+        yield new_segments, next_seek, options.get("language")
+        seek = next_seek
+
+def run_job(task, control, emit):
+    # Inference stage, runs inside a worker process
+    job_id = task["id"]
+    if task.get("threads"):
+        # Each worker is its own process, so this only affects the current job's worker
+        torch.set_num_threads(task["threads"])
+    emit(("status", job_id, f"Loading {task['model']} model..."))
+    # A worker holds one model at a time, the scheduler's memory accounting relies on it
+    for loaded in model_store.loaded_models():
+        if loaded != task["model"]:
+            model_store.unload_model(loaded)
+            _free_memory()
+    model = model_store.load_model(task["model"])
+
+    with attach_shared_audio(*task["audio"]) as audio:
+        return _transcribe_task(task, model, audio, control, emit)
+
+def _transcribe_task(task, model, audio, control, emit):
+    job_id = task["id"]
+    start, end = task.get("start"), task.get("end")
+    duration = len(audio) / SAMPLE_RATE
+    # Segments are reported relative to the original file, not to the decoded range
+    offset = start or 0.0
+    peaks = task.get("peaks")
+    update = task.get("update")
+    if update:
+        # Edited version of a transcribed file, only the changed part runs through the model
+        first = int(update["start"] * SAMPLE_RATE)
+        last = len(audio) if update["end"] is None else int(update["end"] * SAMPLE_RATE)
+        audio = audio[first:last]
+        offset = update["start"]
+        peaks = peak_levels(audio)
+
+    # Same audio, range, model and options share a checkpoint, resume from it if there is one
+    checkpoint = job_checkpoints.JobCheckpoint(task["checkpoint_key"])
+    resume = task.get("resume") or checkpoint.load() or {}
+    checkpoint.start({
+        "file_path": task["file_path"],
+        "model": task["model"],
+        "options": task["options"],
+        "profile": task.get("profile"),
+        "priority": task.get("priority", PRIORITY_NORMAL),
+        "start": start,
+        "end": end
+    })
+    if resume.get("seek"):
+        emit(("status", job_id, f"Resuming from {resume['seek'] / max(len(audio), 1):.0%}..."))
+
+    options = dict(task["options"])
+    options["fp16"] = options.get("fp16", False) and model.device.type != "cpu"
+
+    seek = resume.get("seek", 0)
+    segments = SegmentStore.from_segments(resume.get("segments", []))
+    elapsed = resume.get("elapsed", 0.0)
+    if update:
+        if options.get("language") is None and update.get("language"):
+            options["language"] = update["language"]
+    if resume.get("language"):
+        options["language"] = resume["language"]
+    if options.get("language") is None and task.get("language"):
+        options["language"] = task["language"]
+    if options.get("language") is None:
+        options["language"] = _identify_language(job_id, model, audio, emit)
+    language = options.get("language")
+
+    # Model loading can take a while, don't start decoding a job nobody wants anymore
+    if control.value == CANCEL:
+        checkpoint.remove()
+        raise JobCancelled()
+    if control.value == PREEMPT:
+        raise JobPreempted(resume or None)
+
+    if update:
+        emit(("status", job_id, f"Transcribing the edited part {update['start']:.0f}s-"
+                                f"{duration if update['end'] is None else update['end']:.0f}s..."))
+    else:
+        emit(("status", job_id, "Transcribing..."))
+    start_time = time.perf_counter()
+    # Reused segments before an edit condition the first re-transcribed block
+    context = update["before"] if update and not len(segments) else segments
+    for new_segments, seek, language in transcribe_blocks(model, audio, options, seek, context, peaks):
+        if offset:
+            new_segments = [dict(s, start=s["start"] + offset, end=s["end"] + offset) for s in new_segments]
+        segments.extend(new_segments)
+        checkpoint.append(seek, new_segments, language, elapsed + time.perf_counter() - start_time)
+        emit(("progress", job_id, min(seek / max(len(audio), 1), 1.0)))
+
+        if seek < len(audio) and control.value == CANCEL:
+            checkpoint.remove()
+            raise JobCancelled()
+        if seek < len(audio) and control.value == PREEMPT:
+            raise JobPreempted({
+                "seek": seek,
+                "segments": segments,
+                "language": language,
+                "elapsed": elapsed + time.perf_counter() - start_time
+            })
+
+    checkpoint.remove()
+    if update:
+        segments = update["before"] + segments + update["after"]
+    # The full text is segments.full_text(), no separate copy is sent back
+    return {
+        "segments": segments,
+        "language": language,
+        "duration": duration,
+        "elapsed": elapsed + time.perf_counter() - start_time,
+        "reused_seconds": update["reused_seconds"] if update else 0.0,
+        # Audio that actually went through the model, the basis for speed figures
+        "transcribed_seconds": len(audio) / SAMPLE_RATE
+    }
+
+def _identify_language(job_id, model, audio, emit):
+    if not len(audio):
+        return None
+    if not model.is_multilingual:
+        # English-only models always transcribe English. That says nothing about the
+        # file, so it is neither reported nor cached for multilingual jobs to pick up.
+        return None
+    emit(("status", job_id, "Detecting language..."))
+    language, confidence = language_id.detect_language(model, audio)
+    if language is not None:
+        emit(("language", job_id, {"language": language, "confidence": confidence}))
+    # None leaves detection to Whisper on the first block
+    return language
+
+def _free_memory():
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+def _worker_main(task_queue, event_queue, control):
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        job_id = task["id"]
+        try:
+            result = run_job(task, control, event_queue.put)
+            event_queue.put(("done", job_id, result))
+        except JobCancelled:
+            event_queue.put(("cancelled", job_id, None))
+        except JobPreempted as e:
+            event_queue.put(("preempted", job_id, e.state))
+        except Exception as e:
+            error_msg = str(e)
+            if "CUDA" in error_msg:
+                error_msg += "\n\nTip: This error may be related to GPU memory. Try using a smaller model or CPU only."
+            print(f"Transcription error: {error_msg}")
+            event_queue.put(("error", job_id, error_msg))
+        # Drop the audio and segments of the finished job before waiting for the next one
+        task = None
+        _free_memory()
+
+class _Worker:
+    def __init__(self, ctx, event_queue):
+        self.tasks = ctx.Queue()
+        self.control = ctx.Value("i", RUN)
+        self.process = ctx.Process(target=_worker_main, args=(self.tasks, event_queue, self.control), daemon=True)
+        self.process.start()
+        self.job = None
+        self.model = None  # Model the worker process has loaded, it keeps it between jobs
+        self.language = None  # Language of its last job, the scheduler prefers more of the same
+
+    def assign(self, job):
+        self.control.value = RUN
+        self.job = job
+        self.model = job.model
+        self.language = job.language
+        job.worker = self
+        job.state = "running"
+        job.run_started = time.perf_counter()
+        self.tasks.put(job.to_task())
+
+    def stop(self):
+        self.tasks.put(None)
+
+class TranscriptionEngine:
+    def __init__(self, max_workers=1, on_event=None, use_tuning=True, archive=None, scheduler=None):
+        # on_event(job, kind, data) is called from the engine threads
+        self.ctx = mp.get_context("spawn")
+        self.scheduler = scheduler or ModelScheduler()
+        self.archive = archive  # Finished transcripts are stored here when given
+        self.max_workers = max_workers  # Workers for untuned models
+        self.model_jobs = {}  # Tuned concurrent jobs per model
+        self.cpu_count = os.cpu_count() or 1
+        self.use_tuning = use_tuning
+        self.on_event = on_event
+        self.events = self.ctx.Queue()
+        self.waiting = []  # Probed jobs waiting to be decoded
+        self.pending = []  # Decoded jobs waiting for a worker
+        self.jobs = {}
+        self.workers = []
+        self.lock = threading.RLock()
+        self.stage_changed = threading.Condition(self.lock)
+        self.stats = PipelineStats()
+        self.running = True
+
+        # Queues between the pipeline stages. Decoding is bounded by DECODE_AHEAD and
+        # picks jobs in scheduler order, so decoded audio is there for the job a worker wants next.
+        self.probe_queue = queue.PriorityQueue()
+        self.output_queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self.threads = [
+            threading.Thread(target=loop, daemon=True)
+            for loop in (self._probe_loop, self._decode_loop, self._output_loop, self._event_loop)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, file_path, model, options, priority=PRIORITY_NORMAL, profile=None, start=None, end=None):
+        if start is not None and end is not None and end <= start:
+            raise ValueError("The end of the time range must be after its start")
+        job = Job(file_path, model, options, priority, profile, start, end)
+        with self.lock:
+            self.apply_tuning(job)
+            self.jobs[job.id] = job
+        self.probe_queue.put((-job.priority, job.id, job))
+        return job
+
+    def apply_tuning(self, job):
+        # Use the auto-tuned concurrency and threads for this host and model, if any
+        if not self.use_tuning:
+            return
+        config = autotune.load_config(job.model)
+        if config:
+            job.threads = config["threads"]
+            self.model_jobs[job.model] = config["jobs"]
+
+    def pool_size(self):
+        # Enough workers for the model tuned for the most concurrent jobs
+        return max([self.max_workers] + list(self.model_jobs.values()))
+
+    def _can_start(self, job):
+        # A tuned model never runs more jobs than it was tuned for, and tuned thread
+        # counts of all running jobs together stay within the cores
+        running = [w.job for w in self.workers if w.job is not None]
+        limit = self.model_jobs.get(job.model, self.max_workers)
+        if sum(1 for j in running if j.model == job.model) >= limit:
+            return False
+        busy_threads = sum(j.threads or 0 for j in running)
+        return not running or busy_threads + (job.threads or 0) <= self.cpu_count
+
+    def cancel(self, job_id):
+        # Jobs that haven't reached a worker are dropped right away, running ones stop at the next block boundary
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state not in ("probing", "decoding", "pending", "running"):
+                return False
+            if job.state == "running":
+                job.worker.control.value = CANCEL
+            else:
+                for stage in (self.waiting, self.pending):
+                    if job in stage:
+                        stage.remove(job)
+                # A preempted or resubmitted job may have left a checkpoint, it must not be offered again
+                if job.checkpoint_key:
+                    job_checkpoints.JobCheckpoint(job.checkpoint_key).remove()
+                self.stage_changed.notify_all()
+                self._finish(job, "cancelled", None)
+            return True
+
+    def active_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def shutdown(self):
+        with self.lock:
+            self.running = False
+            self.stage_changed.notify_all()
+            for worker in self.workers:
+                if worker.job is not None:
+                    worker.control.value = CANCEL
+                worker.stop()
+            # Shared audio is unlinked here; workers still reading keep their mapping until they let go
+            for job in self.jobs.values():
+                self._release_audio(job)
+        self.probe_queue.put((float("inf"), 0, None))
+
+    def scheduler_stats(self):
+        with self.lock:
+            return self.scheduler.stats(self.pool_size())
+
+    def pipeline_stats(self):
+        return self.stats.report(max(len(self.workers), 1))
+
+    # Pipeline stages
+
+    def _probe_loop(self):
+        while self.running:
+            _, _, job = self.probe_queue.get()
+            if job is None or not self.running:
+                break
+            if job.state != "probing":
+                continue  # Cancelled while queued
+            try:
+                with self.stats.timed("probe"):
+                    if not os.path.isfile(job.file_path):
+                        raise RuntimeError(f"File not found: {job.file_path}")
+                    key_options = job.options
+                    if job.start or job.end is not None:
+                        key_options = dict(job.options, time_range=[job.start, job.end])
+                        # Hashing a multi-hour file would cost more than decoding a short range
+                        job.audio_hash = job_checkpoints.file_identity(job.file_path)
+                    else:
+                        job.audio_hash = job_checkpoints.audio_hash(job.file_path)
+                    job.checkpoint_key = job_checkpoints.job_key(job.audio_hash, job.model, key_options)
+                    if job.language is None:
+                        job.language = language_id.cached_language(job.audio_hash)
+            except Exception as e:
+                self._fail(job, str(e))
+                continue
+            with self.lock:
+                if job.state != "probing":
+                    continue
+                job.state = "decoding"
+                self.waiting.append(job)
+                self.stage_changed.notify_all()
+
+    def _can_decode(self):
+        # Don't decode further ahead than the workers can use, unless a queued job outranks the decoded ones
+        if not self.waiting:
+            return False
+        if len(self.pending) < DECODE_AHEAD:
+            return True
+        return max(job.priority for job in self.waiting) > max(job.priority for job in self.pending)
+
+    def _decode_loop(self):
+        while True:
+            with self.lock:
+                while self.running and not self._can_decode():
+                    self.stage_changed.wait()
+                if not self.running:
+                    break
+                models = {w.model for w in self.workers if w.model} | {j.model for j in self.pending}
+                languages = {w.language for w in self.workers} | {j.language for j in self.pending}
+                job = self.scheduler.pick_to_prepare(self.waiting, models, languages)
+                self.waiting.remove(job)
+            self._notify(job, "status", "Decoding audio...")
+            audio = None
+            try:
+                with self.stats.timed("decode"):
+                    audio = SharedAudio.decode(job.file_path, job.start, job.end)
+                with self.stats.timed("features"):
+                    peaks = peak_levels(audio.array())
+                    update = self._plan_update(job, audio)
+            except Exception as e:
+                if audio is not None:
+                    audio.release()
+                self._fail(job, str(e))
+                continue
+            with self.lock:
+                if job.state != "decoding":
+                    audio.release()  # Cancelled while decoding
+                    continue
+                if update is not None and update["unchanged"]:
+                    # Same audio as last time, the stored transcript goes straight to the output stage
+                    audio.release()
+                    job.state = "output"
+                    data = {
+                        "segments": update["before"],
+                        "language": update["language"],
+                        "duration": audio.samples / SAMPLE_RATE,
+                        "elapsed": 0.0,
+                        "reused_seconds": update["reused_seconds"],
+                        "transcribed_seconds": 0.0
+                    }
+                    self._notify(job, "status", "Audio unchanged since the last transcription")
+                else:
+                    data = None
+                    job.audio = audio
+                    job.peaks = peaks
+                    job.update = update
+                    job.state = "pending"
+                    self.pending.append(job)
+                    self._notify(job, "status", "Waiting for a worker...")
+                    self._dispatch()
+            if data is not None:
+                self.output_queue.put((job, data))
+
+    def _plan_update(self, job, audio):
+        # Fingerprint whole-file jobs and reuse what is unchanged since the last transcription of this file
+        if job.start or job.end is not None:
+            return None
+        job.fingerprint = audio_versions.fingerprint(audio.array(), SAMPLE_RATE)
+        previous = audio_versions.load_version(job.file_path, job.model, job.options)
+        if previous is None:
+            return None
+        update = audio_versions.plan_update(previous, job.fingerprint, SAMPLE_RATE)
+        if update is not None:
+            # The partial job gets its own checkpoint, a full one of the same audio can't be resumed from it
+            job.checkpoint_key = job_checkpoints.job_key(
+                job.audio_hash, job.model, dict(job.options, update=[update["start"], update["end"]])
+            )
+            print(f"{job.file_path}: reusing {update['reused_seconds']:.0f}s of the previous transcript")
+        return update
+
+    def _output_loop(self):
+        while True:
+            job, data = self.output_queue.get()
+            if job is None:
+                break
+            with self.stats.timed("output"):
+                self._archive(job, data)
+                self._save_version(job, data)
+            with self.lock:
+                self._finish(job, "done", data)
+
+    def _next_job(self):
+        # Highest priority first, oldest first within a priority
+        if not self.pending:
+            return None
+        return max(self.pending, key=lambda job: (job.priority, -job.id))
+
+    def _dispatch(self):
+        # Retire idle workers beyond the current limit
+        for worker in [w for w in self.workers if w.job is None][:max(len(self.workers) - self.pool_size(), 0)]:
+            self._retire(worker)
+
+        while self.running and self.pending:
+            runnable = [job for job in self.pending if self._can_start(job)]
+            if not runnable:
+                # Waits for a running job to end, unless an urgent one can make it step aside
+                self._preempt_for(self._next_job())
+                return
+            idle = [w for w in self.workers if w.job is None]
+            if not idle:
+                if len(self.workers) < self.pool_size():
+                    self.workers.append(_Worker(self.ctx, self.events))
+                    continue
+                self._preempt_for(self._next_job())
+                return
+
+            # Serve idle workers that already hold a model somebody is waiting for first
+            pending_models = {job.model for job in self.pending}
+            worker = min(idle, key=lambda w: w.model not in pending_models)
+            resident = [w.model for w in self.workers if w is not worker and w.model]
+            job = self.scheduler.pick(runnable, worker.model, resident, worker.language, self.waiting)
+            if job is None:
+                # Nothing fits next to the models other workers hold. Idle workers give
+                # theirs up; busy ones free theirs when their job ends.
+                spare = [w for w in idle if w is not worker and w.model]
+                if spare:
+                    for w in spare:
+                        self._retire(w)
+                    continue
+                if any(w.job is not None for w in self.workers):
+                    return
+                job = self.scheduler.pick(runnable, worker.model, worker_language=worker.language, waiting=self.waiting)
+            self.pending.remove(job)
+            self.stage_changed.notify_all()
+            worker.assign(job)
+            self._notify(job, "started", None)
+
+    def _retire(self, worker):
+        worker.stop()
+        self.workers.remove(worker)
+
+    def _preempt_for(self, job):
+        # Ask the lowest priority running job to step aside for a more urgent one
+        running = [w for w in self.workers if w.job is not None and w.control.value == RUN]
+        if not running:
+            return
+        victim = min(running, key=lambda w: (w.job.priority, -w.job.id))
+        if victim.job.priority < job.priority:
+            print(f"Preempting job {victim.job.id} for urgent job {job.id}")
+            victim.control.value = PREEMPT
+
+    def _leave_worker(self, job):
+        # The job no longer occupies its worker (finished, cancelled, failed or preempted)
+        if job.worker is not None:
+            job.worker.job = None
+            job.worker = None
+        if job.run_started is not None:
+            self.stats.add("inference", time.perf_counter() - job.run_started)
+            job.run_started = None
+
+    def _release_audio(self, job):
+        if job.audio is not None:
+            job.audio.release()
+            job.audio = None
+            job.peaks = None
+
+    def _finish(self, job, state, data):
+        job.state = state
+        self._leave_worker(job)
+        self._release_audio(job)
+        if state == "done":
+            job.result = data
+            job.progress = 1.0
+        elif state == "error":
+            job.error = data
+        # Finished jobs don't need to keep their results around in the engine
+        self.jobs.pop(job.id, None)
+        if not self.jobs:
+            self.stats.idle()
+        self._notify(job, state, data)
+
+    def _fail(self, job, message):
+        print(f"Transcription error: {message}")
+        with self.lock:
+            if job.state in ("probing", "decoding"):
+                self._finish(job, "error", message)
+
+    def _notify(self, job, kind, data):
+        if self.on_event:
+            try:
+                self.on_event(job, kind, data)
+            except Exception as e:
+                print(f"Engine event handler failed: {e}")
+
+    def _handle(self, kind, job_id, data):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if kind == "progress":
+                job.progress = data
+                self._notify(job, kind, data)
+            elif kind == "status":
+                self._notify(job, kind, data)
+            elif kind == "language":
+                job.language = data["language"]
+                if job.worker is not None:
+                    job.worker.language = job.language
+                try:
+                    language_id.cache_language(job.audio_hash, data["language"], data["confidence"], job.model)
+                except OSError as e:
+                    print(f"Could not cache the language of {job.file_path}: {e}")
+                self._notify(job, "status", f"Language: {data['language']} ({data['confidence']:.0%} confidence)")
+            elif kind == "preempted":
+                # Back into the queue with its audio still decoded, it resumes from the saved position later
+                self._leave_worker(job)
+                job.resume = data
+                job.state = "pending"
+                self.pending.append(job)
+                self._notify(job, kind, data)
+            elif kind == "done":
+                # Free the worker and the audio now, archiving happens in the output stage
+                self._leave_worker(job)
+                self._release_audio(job)
+                job.state = "output"
+            else:
+                self._finish(job, kind, data)
+            self._dispatch()
+        if kind == "done":
+            self.output_queue.put((job, data))
+
+    def _archive(self, job, result):
+        if self.archive is None:
+            return
+        try:
+            result["transcript_id"] = self.archive.add_transcript(
+                job.file_path,
+                result["segments"],
+                model=job.model,
+                profile=job.profile,
+                language=result["language"],
+                duration=result["duration"]
+            )
+        except Exception as e:
+            # The transcript is still delivered, it just won't be searchable
+            print(f"Could not archive transcript of {job.file_path}: {e}")
+
+    def _save_version(self, job, result):
+        if job.fingerprint is None:
+            return
+        try:
+            audio_versions.save_version(
+                job.file_path, job.model, job.options, job.fingerprint, result["segments"], result["language"]
+            )
+        except OSError as e:
+            print(f"Could not save the audio fingerprint of {job.file_path}: {e}")
+
+    def _check_workers(self):
+        # A crashed worker process would otherwise leave its job running forever
+        with self.lock:
+            for worker in list(self.workers):
+                if worker.process.is_alive():
+                    continue
+                self.workers.remove(worker)
+                if worker.job is not None:
+                    self._finish(worker.job, "error", f"Worker process exited with code {worker.process.exitcode}")
+            self._dispatch()
+
+    def _event_loop(self):
+        while self.running:
+            try:
+                kind, job_id, data = self.events.get(timeout=0.5)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            self._handle(kind, job_id, data)
+        self.output_queue.put((None, None))
+
+def main(argv=None):
+    # Headless transcription, e.g.:
+    #   python transcription_engine.py talk.mp3 --model small --start 42:00 --end 55:00
+    parser = argparse.ArgumentParser(description="Transcribe an audio file without the GUI")
+    parser.add_argument("file")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--profile", default="balanced", choices=list(DECODING_PROFILES))
+    parser.add_argument("--language", default=None, help="Language code, e.g. en (default: auto-detect)")
+    parser.add_argument("--start", type=parse_timestamp, default=None, help="Start of the range, e.g. 42:00")
+    parser.add_argument("--end", type=parse_timestamp, default=None, help="End of the range, e.g. 55:00")
+    parser.add_argument("--no-archive", action="store_true", help="Don't store the transcript in the archive")
+    args = parser.parse_args(argv)
+    if args.start is not None and args.end is not None and args.end <= args.start:
+        parser.error("--end must be after --start")
+
+    from transcript_archive import TranscriptArchive, format_timestamp
+
+    finished = threading.Event()
+    outcome = {}
+
+    def on_event(job, kind, data):
+        if kind in ("done", "error", "cancelled"):
+            outcome["kind"], outcome["data"] = kind, data
+            finished.set()
+        elif kind == "status":
+            print(data, file=sys.stderr)
+
+    archive = None if args.no_archive else TranscriptArchive()
+    engine = TranscriptionEngine(on_event=on_event, archive=archive)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    engine.submit(
+        args.file,
+        args.model,
+        build_transcribe_options(args.profile, args.language, device),
+        profile=args.profile,
+        start=args.start,
+        end=args.end
+    )
+    finished.wait()
+    engine.shutdown()
+    stats = engine.scheduler_stats()
+    print(f"Model loads: {stats['model_loads']} (FIFO order would need {stats['fifo_loads']}), "
+          f"avoided by the scheduler: {stats['loads_avoided']}", file=sys.stderr)
+    print(f"Pipeline utilization: {format_pipeline_stats(engine.pipeline_stats())}", file=sys.stderr)
+
+    if outcome["kind"] != "done":
+        print(f"Transcription failed: {outcome['data']}", file=sys.stderr)
+        return 1
+    for start, end, text in outcome["data"]["segments"].rows():
+        print(f"[{format_timestamp(start)} --> {format_timestamp(end)}] {text.strip()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import time
+import tkinter
+
+# Event-loop latency monitor for the GUI. Every Python callback Tk runs (button
+# commands, event bindings, after() timers) goes through tkinter.CallWrapper;
+# wrapping it times each callback, so anything that holds up the event loop for
+# longer than a frame is logged with its name and duration. Callbacks that other
+# callbacks ran inside of (modal dialogs, update()) were running a nested event
+# loop, mostly waiting for the user, so they are not reported.
+
+SLOW_CALLBACK_MS = float(os.environ.get("WHISPER_GUI_SLOW_CALLBACK_MS", 16))  # One frame at 60 Hz, 0 turns it off
+
+def callback_name(func):
+    # after() and after_idle() wrap their callback in a local callit function, report the real one
+    if getattr(func, "__qualname__", "").endswith("after.<locals>.callit") and func.__closure__:
+        cells = dict(zip(func.__code__.co_freevars, func.__closure__))
+        if "func" in cells:
+            func = cells["func"].cell_contents
+    name = getattr(func, "__qualname__", None) or repr(func)
+    if name.endswith("<lambda>"):
+        code = getattr(func, "__code__", None)
+        if code is not None:
+            name += f" ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name
+
+class LatencyMonitor:
+    def __init__(self, threshold_ms=SLOW_CALLBACK_MS, report=print):
+        self.threshold = threshold_ms / 1000
+        self.report = report
+        self.callbacks = 0
+        self.slow = {}  # name -> (count, worst seconds)
+        self.nested = []  # Callbacks run inside each callback currently on the stack
+        self.original = None
+
+    def install(self):
+        # Callbacks registered after this are timed, so install before building the UI
+        if self.original is not None or self.threshold <= 0:
+            return
+        self.original = original = tkinter.CallWrapper
+        monitor = self
+
+        class TimedCallWrapper(original):
+            def __call__(self, *args):
+                monitor.nested.append(0)
+                start_time = time.perf_counter()
+                try:
+                    return super().__call__(*args)
+                finally:
+                    seconds = time.perf_counter() - start_time
+                    inner = monitor.nested.pop()
+                    if monitor.nested:
+                        monitor.nested[-1] += 1
+                    monitor.record(self.func, seconds, inner)
+
+        tkinter.CallWrapper = TimedCallWrapper
+
+    def uninstall(self):
+        if self.original is not None:
+            tkinter.CallWrapper = self.original
+            self.original = None
+
+    def record(self, func, seconds, nested=0):
+        self.callbacks += 1
+        if seconds < self.threshold or nested:
+            return
+        name = callback_name(func)
+        count, worst = self.slow.get(name, (0, 0.0))
+        self.slow[name] = (count + 1, max(worst, seconds))
+        self.report(f"Slow UI callback: {name} took {seconds * 1000:.1f} ms")
+
+    def summary(self, limit=5):
+        # Worst offenders first
+        slow_total = sum(count for count, _ in self.slow.values())
+        lines = [f"UI callbacks: {self.callbacks}, slower than {self.threshold * 1000:.0f} ms: {slow_total}"]
+        for name, (count, worst) in sorted(self.slow.items(), key=lambda item: -item[1][1])[:limit]:
+            lines.append(f"  {name}: {count}x, worst {worst * 1000:.1f} ms")
+        return "\n".join(lines)
@@ -6,12 +6,20 @@ from tkinter import filedialog, messagebox, Toplevel
 import customtkinter as ctk
 import whisper
 import subprocess
-import ssl
-import certifi
 import sys
+import time
+import torch
+import job_checkpoints
+import autotune
+from transcript_archive import TranscriptArchive, format_timestamp
+from segment_store import SegmentStore, export as export_segments
+from ui_latency import LatencyMonitor
+from transcription_engine import (
+    TranscriptionEngine, DECODING_PROFILES, PRIORITY_NORMAL, PRIORITY_URGENT,
+    build_transcribe_options, parse_timestamp, format_pipeline_stats
+)
 
-# Fix SSL certificate issues
-ssl._create_default_https_context = ssl._create_unverified_context
+AUTO_LANGUAGE = "Auto-detect"
 
 # Check for FFmpeg and install if necessary
 def check_ffmpeg():
@@ -55,7 +63,12 @@ ctk.set_default_color_theme("green")
 
 class WhisperGUI(ctk.CTk):
     def __init__(self):
+        # Log Tk callbacks that hold up the event loop for more than a frame. Installed
+        # before the window exists so the callbacks CTk registers while setting up are timed too.
+        latency_monitor = LatencyMonitor()
+        latency_monitor.install()
         super().__init__()
+        self.latency_monitor = latency_monitor
         
         # Configure window
         self.title("Whisper Transcription")
@@ -76,12 +89,30 @@ class WhisperGUI(ctk.CTk):
         # Variables
         self.file_path = None
         self.model_size = ctk.StringVar(value="base")
+        self.decoding_profile = ctk.StringVar(value="balanced")
+        self.language = ctk.StringVar(value=AUTO_LANGUAGE)
+        self.profile_stats = {}  # (model, profile) -> list of realtime factors
         self.result_queue = queue.Queue()
         self.selected_model_button = None
         self.tooltip_window = None
+        self.tooltips = {}  # Pre-built tooltip windows per model, shown and hidden instead of rebuilt
+        self.fonts = {}
         self.is_transcribing = False
         self.progress_value = ctk.DoubleVar(value=0.0)
         self.progress_text = ctk.StringVar(value="")
+        self.urgent = ctk.BooleanVar(value=False)
+        self.active_jobs = {}
+        self.current_job = None
+        self.search_window = None
+        self.search_after_id = None
+        self.shown_segments = None  # SegmentStore of the transcript on screen, for Export
+        self.shown_name = None
+        self.shown_language = None
+
+        # Transcriptions run in background worker processes and end up in the searchable archive
+        self.archive = TranscriptArchive()
+        self.engine = TranscriptionEngine(on_event=self.on_engine_event, archive=self.archive)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Model information dictionary
         self.model_info = {
@@ -125,9 +156,13 @@ class WhisperGUI(ctk.CTk):
         
         # Create UI
         self.create_ui()
+        self.after_idle(self.build_tooltips)
         
         # Start queue checker
         self.check_queue()
+
+        # Offer to pick up transcriptions interrupted by a crash or reboot
+        self.after(500, self.offer_resume)
     
     def create_ui(self):
         # Create main frame with grid layout
@@ -151,7 +186,7 @@ class WhisperGUI(ctk.CTk):
         self.progress_label = ctk.CTkLabel(
             self.main_frame,
             textvariable=self.progress_text,
-            font=ctk.CTkFont(size=14),
+            font=self.font(14),
             text_color="#666666"
         )
         self.progress_label.grid(row=5, column=0, pady=(5, 10))
@@ -168,7 +203,7 @@ class WhisperGUI(ctk.CTk):
         title_label = ctk.CTkLabel(
             self.main_frame, 
             text="Whisper Transcription", 
-            font=ctk.CTkFont(size=28, weight="bold"),
+            font=self.font(28, "bold"),
             text_color="#000000"
         )
         title_label.grid(row=0, column=0, pady=(0, 20))
@@ -188,14 +223,14 @@ class WhisperGUI(ctk.CTk):
         upload_icon = ctk.CTkLabel(
             self.upload_frame,
             text="⬆️",
-            font=ctk.CTkFont(size=32)
+            font=self.font(32)
         )
         upload_icon.grid(row=0, column=0, pady=(20, 5))
         
         upload_text = ctk.CTkLabel(
             self.upload_frame,
             text="Click to upload or drag and drop",
-            font=ctk.CTkFont(size=16, weight="normal"),
+            font=self.font(16),
             text_color="#000000"
         )
         upload_text.grid(row=1, column=0)
@@ -203,7 +238,7 @@ class WhisperGUI(ctk.CTk):
         format_text = ctk.CTkLabel(
             self.upload_frame,
             text="Supported formats: .mp3, .wav, .m4a, .ogg, .flac",
-            font=ctk.CTkFont(size=12, weight="normal"),
+            font=self.font(12),
             text_color="#666666"
         )
         format_text.grid(row=2, column=0, pady=(5, 20))
@@ -217,7 +252,7 @@ class WhisperGUI(ctk.CTk):
         self.file_label = ctk.CTkLabel(
             self.main_frame,
             text="",
-            font=ctk.CTkFont(size=14),
+            font=self.font(14),
             text_color="#666666"
         )
         self.file_label.grid(row=2, column=0, pady=(0, 20))
@@ -226,7 +261,7 @@ class WhisperGUI(ctk.CTk):
         model_label = ctk.CTkLabel(
             self.main_frame, 
             text="Select Whisper Model",
-            font=ctk.CTkFont(size=20, weight="bold"),
+            font=self.font(20, "bold"),
             text_color="#000000"
         )
         model_label.grid(row=3, column=0, pady=(0, 10))
@@ -253,7 +288,7 @@ class WhisperGUI(ctk.CTk):
                 text_color="#2CC985",
                 border_color="#2CC985",
                 hover_color="#25a06e",
-                font=ctk.CTkFont(size=13),
+                font=self.font(13),
                 command=lambda m=model: self.select_model(m)
             )
             # Make buttons more responsive
@@ -264,7 +299,80 @@ class WhisperGUI(ctk.CTk):
             # Create tooltip for model info
             button.bind("<Enter>", lambda e, m=model: self.show_model_tooltip(e, m))
             button.bind("<Leave>", lambda e: self.hide_model_tooltip())
-        
+
+        # Decoding profile and language selection
+        options_frame = ctk.CTkFrame(model_buttons_frame, fg_color="transparent")
+        options_frame.grid(row=1, column=0, columnspan=6, pady=(10, 0))
+
+        self.profile_selector = ctk.CTkSegmentedButton(
+            options_frame,
+            values=list(DECODING_PROFILES),
+            variable=self.decoding_profile,
+            selected_color="#2CC985",
+            selected_hover_color="#25a06e",
+            font=self.font(13),
+            command=lambda p: self.update_speed_label()
+        )
+        self.profile_selector.grid(row=0, column=0, padx=5)
+
+        languages = sorted(name.title() for name in whisper.tokenizer.LANGUAGES.values())
+        self.language_menu = ctk.CTkOptionMenu(
+            options_frame,
+            values=[AUTO_LANGUAGE] + languages,
+            variable=self.language,
+            width=150,
+            fg_color="#2CC985",
+            button_color="#25a06e",
+            button_hover_color="#25a06e",
+            font=self.font(13)
+        )
+        self.language_menu.grid(row=0, column=1, padx=5)
+
+        # Benchmark concurrency x threads for the selected model on this host
+        self.autotune_button = ctk.CTkButton(
+            options_frame,
+            text="Auto-tune",
+            width=90,
+            height=28,
+            fg_color="transparent",
+            border_width=2,
+            border_color="#2CC985",
+            text_color="#2CC985",
+            hover_color="#e0f5ea",
+            font=self.font(13),
+            command=self.start_autotune
+        )
+        self.autotune_button.grid(row=0, column=2, padx=5)
+
+        # Optional time range, only that part of the file is decoded and transcribed
+        range_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
+        range_frame.grid(row=2, column=0, columnspan=3, pady=(5, 0))
+        self.range_start_entry = ctk.CTkEntry(
+            range_frame,
+            placeholder_text="From (e.g. 42:00)",
+            width=140,
+            border_color="#2CC985",
+            font=self.font(13)
+        )
+        self.range_start_entry.grid(row=0, column=0, padx=5)
+        self.range_end_entry = ctk.CTkEntry(
+            range_frame,
+            placeholder_text="To (e.g. 55:00)",
+            width=140,
+            border_color="#2CC985",
+            font=self.font(13)
+        )
+        self.range_end_entry.grid(row=0, column=1, padx=5)
+
+        # Measured speed of each profile for the selected model
+        self.speed_label = ctk.CTkLabel(
+            options_frame,
+            text="",
+            font=self.font(12),
+            text_color="#666666"
+        )
+        self.speed_label.grid(row=1, column=0, columnspan=3, pady=(5, 0))
+
         # Set base as default selected model
         self.select_model("base")
         
@@ -307,6 +415,61 @@ class WhisperGUI(ctk.CTk):
             command=self.start_transcription
         )
         self.transcribe_button.grid(row=0, column=1, padx=10)
+
+        self.cancel_button = ctk.CTkButton(
+            control_frame,
+            text="Cancel",
+            width=120,
+            height=32,
+            fg_color="transparent",
+            border_width=2,
+            border_color="#FF5555",
+            text_color="#FF5555",
+            hover_color="#ffe5e5",
+            state="disabled",
+            command=self.cancel_transcription
+        )
+        self.cancel_button.grid(row=0, column=2, padx=10)
+
+        # Urgent jobs interrupt a running batch job, which resumes afterwards
+        self.urgent_checkbox = ctk.CTkCheckBox(
+            control_frame,
+            text="Urgent",
+            variable=self.urgent,
+            fg_color="#2CC985",
+            hover_color="#25a06e",
+            font=self.font(13)
+        )
+        self.urgent_checkbox.grid(row=0, column=3, padx=10)
+
+        self.search_button = ctk.CTkButton(
+            control_frame,
+            text="🔍 Search",
+            width=100,
+            height=32,
+            fg_color="transparent",
+            border_width=2,
+            border_color="#2CC985",
+            text_color="#2CC985",
+            hover_color="#e0f5ea",
+            command=self.open_search
+        )
+        self.search_button.grid(row=0, column=4, padx=10)
+
+        self.export_button = ctk.CTkButton(
+            control_frame,
+            text="💾 Export",
+            width=100,
+            height=32,
+            fg_color="transparent",
+            border_width=2,
+            border_color="#2CC985",
+            text_color="#2CC985",
+            hover_color="#e0f5ea",
+            state="disabled",
+            command=self.export_transcript
+        )
+        self.export_button.grid(row=0, column=5, padx=10)
         
         # Transcription result
         self.result_frame = ctk.CTkFrame(
@@ -325,25 +488,34 @@ class WhisperGUI(ctk.CTk):
             wrap="word",
             fg_color="transparent",
             border_width=0,
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         self.result_text.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
             
 
-    def show_model_tooltip(self, event, model):
-        if self.tooltip_window:
-            self.hide_model_tooltip()
-        
-        # Create tooltip window
-        self.tooltip_window = Toplevel(self)
-        self.tooltip_window.overrideredirect(True)
-        self.tooltip_window.configure(bg="#1c1c1c")
+    def font(self, size, weight="normal"):
+        # Shared CTkFont objects, creating a new one per widget update is slow on remote displays
+        key = (size, weight)
+        if key not in self.fonts:
+            self.fonts[key] = ctk.CTkFont(size=size, weight=weight)
+        return self.fonts[key]
+
+    def build_tooltips(self):
+        for model in self.model_info:
+            if model not in self.tooltips:
+                self.tooltips[model] = self.build_tooltip(model)
+
+    def build_tooltip(self, model):
+        tooltip = Toplevel(self)
+        tooltip.withdraw()
+        tooltip.overrideredirect(True)
+        tooltip.configure(bg="#1c1c1c")
         
         # Get model info
         info = self.model_info[model]
         
         # Create tooltip content
-        tooltip_frame = ctk.CTkFrame(self.tooltip_window, fg_color="#1c1c1c", corner_radius=8)
+        tooltip_frame = ctk.CTkFrame(tooltip, fg_color="#1c1c1c", corner_radius=8)
         tooltip_frame.pack(padx=2, pady=2)
         
         # Add model info labels
@@ -358,20 +530,30 @@ class WhisperGUI(ctk.CTk):
             label = ctk.CTkLabel(
                 tooltip_frame,
                 text=text,
-                font=ctk.CTkFont(size=12),
+                font=self.font(12),
                 text_color="white",
                 anchor="w"
             )
             label.pack(padx=10, pady=(5 if i == 0 else 2, 5 if i == len(labels)-1 else 2), anchor="w")
+        return tooltip
+
+    def show_model_tooltip(self, event, model):
+        if self.tooltip_window:
+            self.hide_model_tooltip()
+        if model not in self.tooltips:
+            self.tooltips[model] = self.build_tooltip(model)
+        self.tooltip_window = self.tooltips[model]
         
         # Position tooltip below the button
         x = event.widget.winfo_rootx()
         y = event.widget.winfo_rooty() + event.widget.winfo_height() + 5
         self.tooltip_window.geometry(f"+{x}+{y}")
+        self.tooltip_window.deiconify()
+        self.tooltip_window.lift()
     
     def hide_model_tooltip(self, event=None):
         if self.tooltip_window:
-            self.tooltip_window.destroy()
+            self.tooltip_window.withdraw()
             self.tooltip_window = None
     
     def select_file(self, event=None):
@@ -394,7 +576,7 @@ class WhisperGUI(ctk.CTk):
             filename = os.path.basename(file_path)
             self.file_label.configure(
                 text=f"Selected: {filename}",
-                font=ctk.CTkFont(size=14, weight="bold")
+                font=self.font(14, "bold")
             )
             # Flash effect for successful upload
             self.after(100, lambda: self.file_label.configure(text_color="#2CC985"))
@@ -405,67 +587,329 @@ class WhisperGUI(ctk.CTk):
         self.file_label.configure(text="")
         self.file_path = None
         self.progress_bar.set(0)
+        self.show_segments(None)
+
+    def show_segments(self, segments, name=None, language=None):
+        # Remember the transcript on screen so Export can write it out
+        self.shown_segments = segments
+        self.shown_name = name
+        self.shown_language = language
+        self.export_button.configure(state="normal" if segments is not None and len(segments) else "disabled")
+
+    def export_transcript(self):
+        if self.shown_segments is None:
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".srt",
+            initialfile=os.path.splitext(os.path.basename(self.shown_name or "transcript"))[0],
+            filetypes=[
+                ("SubRip subtitles", "*.srt"),
+                ("WebVTT subtitles", "*.vtt"),
+                ("Plain text", "*.txt"),
+                ("JSON", "*.json")
+            ]
+        )
+        if not path:
+            return
+        try:
+            # Written segment by segment straight from the store
+            export_segments(self.shown_segments, path, language=self.shown_language)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Export failed: {e}")
     
     def start_transcription(self):
         if not self.file_path:
             messagebox.showwarning("No File Selected", "Please select an audio file first.")
             return
-        
-        if self.is_transcribing:
-            messagebox.showwarning("In Progress", "Transcription is already in progress.")
+
+        # Read the Tk variables here, the engine thread must not touch them
+        language = self.language.get()
+        # The menu shows names, results and caches use Whisper's language codes ("en")
+        language = None if language == AUTO_LANGUAGE else whisper.tokenizer.TO_LANGUAGE_CODE[language.lower()]
+        profile = self.decoding_profile.get()
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        priority = PRIORITY_URGENT if self.urgent.get() else PRIORITY_NORMAL
+
+        # Jobs are queued, an urgent one preempts a running normal job at its next block boundary
+        try:
+            job = self.engine.submit(
+                self.file_path,
+                self.model_size.get(),
+                build_transcribe_options(profile, language, device),
+                priority=priority,
+                profile=profile,
+                start=parse_timestamp(self.range_start_entry.get()),
+                end=parse_timestamp(self.range_end_entry.get())
+            )
+        except ValueError as e:
+            messagebox.showwarning("Invalid Time Range", f"Use times like 42:00 or 1:02:03.\n\n{e}")
             return
-        
+        self.active_jobs[job.id] = job
+        self.current_job = job
         self.is_transcribing = True
-        self.transcribe_button.configure(state="disabled")
-        self.clear_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
         self.progress_bar.set(0)
         self.result_text.delete("1.0", "end")
         self.result_text.insert("1.0", "Transcribing...")
-        
-        # Start transcription in a separate thread
-        threading.Thread(target=self.transcribe_audio, daemon=True).start()
-    
-    def transcribe_audio(self):
+        self.update_job_label(job, "Queued")
+
+    def offer_resume(self):
+        unfinished = job_checkpoints.unfinished_jobs()
+        if not unfinished:
+            return
+        names = "\n".join(f"• {os.path.basename(header['file_path'])} ({header['model']})" for header in unfinished[:10])
+        answer = messagebox.askyesnocancel(
+            "Resume Transcriptions",
+            f"{len(unfinished)} transcription(s) did not finish last time:\n\n{names}\n\n"
+            "Resume them from their last checkpoint?\n\n"
+            "Yes resumes them, No discards the saved progress, Cancel asks again next time."
+        )
+        if answer is None:
+            return
+        if not answer:
+            job_checkpoints.discard(unfinished)
+            return
+        for header in unfinished:
+            job = self.engine.submit(
+                header["file_path"],
+                header["model"],
+                header["options"],
+                priority=header.get("priority", PRIORITY_NORMAL),
+                profile=header.get("profile"),
+                start=header.get("start"),
+                end=header.get("end")
+            )
+            self.active_jobs[job.id] = job
+            self.current_job = self.current_job or job
+        self.is_transcribing = True
+        self.cancel_button.configure(state="normal")
+
+    def start_autotune(self):
+        if not self.file_path:
+            messagebox.showwarning("No File Selected", "Select an audio file to use as calibration audio first.")
+            return
+        if self.is_transcribing:
+            messagebox.showwarning("In Progress", "Wait for the running transcriptions to finish, they would skew the benchmark.")
+            return
+
+        model = self.model_size.get()
+        self.autotune_button.configure(state="disabled")
+        threading.Thread(target=self.run_autotune, args=(model, self.file_path), daemon=True).start()
+
+    def run_autotune(self, model, calibration_file):
+        report = lambda message: self.result_queue.put(("autotune", None, message))
         try:
-            # Load the model
-            model = whisper.load_model(self.model_size.get())
-            
-            # Transcribe the audio
-            result = model.transcribe(self.file_path)
-            
-            # Put the result in the queue
-            self.result_queue.put(("success", result["text"]))
-            
+            config = autotune.autotune(model, calibration_file, report=report)
+            self.result_queue.put(("autotune_done", None, config))
         except Exception as e:
-            self.result_queue.put(("error", str(e)))
-        
-        # Update progress
-        self.progress_value.set(1.0)
-    
+            self.result_queue.put(("autotune_done", None, str(e)))
+
+    def cancel_transcription(self):
+        if self.current_job is not None:
+            self.engine.cancel(self.current_job.id)
+            self.update_job_label(self.current_job, "Cancelling...")
+
+    def on_engine_event(self, job, kind, data):
+        # Called from the engine thread, hand everything over to the Tk thread
+        self.result_queue.put((kind, job, data))
+
+    def update_job_label(self, job, status):
+        others = len(self.active_jobs) - (1 if job.id in self.active_jobs else 0)
+        name = os.path.basename(job.file_path)
+        if job.start is not None or job.end is not None:
+            name += f" [{format_timestamp(job.start or 0)}-{format_timestamp(job.end) if job.end is not None else 'end'}]"
+        text = f"{name} ({job.model}, {job.profile}): {status}"
+        if others:
+            text += f" · {others} more job{'s' if others > 1 else ''} queued"
+        self.file_label.configure(text=text)
+
+    def job_finished(self, job):
+        self.active_jobs.pop(job.id, None)
+        self.is_transcribing = bool(self.active_jobs)
+        if self.current_job is job:
+            # Follow the next job that is still queued or running
+            self.current_job = next(iter(self.active_jobs.values()), None)
+        if self.current_job is None:
+            self.cancel_button.configure(state="disabled")
+
+    def record_profile_speed(self, result):
+        # Remember the realtime factor so profiles can be compared per model. Partial
+        # re-transcriptions of edited files only ran the model on the edit, so they don't count.
+        if result["elapsed"] <= 0 or result.get("reused_seconds"):
+            return
+        key = (result["model"], result["profile"])
+        self.profile_stats.setdefault(key, []).append(result["transcribed_seconds"] / result["elapsed"])
+        self.update_speed_label()
+
+    def update_speed_label(self):
+        model = self.model_size.get()
+        parts = []
+        for profile in DECODING_PROFILES:
+            speeds = self.profile_stats.get((model, profile))
+            if speeds:
+                parts.append(f"{profile}: {sum(speeds) / len(speeds):.1f}x realtime")
+            else:
+                parts.append(f"{profile}: not measured")
+        description = DECODING_PROFILES[self.decoding_profile.get()]["description"]
+        tuning = autotune.load_config(model)
+        if tuning:
+            description += f" · tuned: {tuning['jobs']} job(s) x {tuning['threads']} thread(s)"
+        self.speed_label.configure(text=f"{description}\n{model} speed - " + " · ".join(parts))
+
     def check_queue(self):
-        try:
-            status, result = self.result_queue.get_nowait()
-            
-            if status == "success":
+        # Handle everything the engine reported since the last check
+        while True:
+            try:
+                kind, job, data = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "autotune":
+                self.file_label.configure(text=data)
+            elif kind == "autotune_done":
+                self.autotune_button.configure(state="normal")
+                if isinstance(data, dict):
+                    self.update_speed_label()
+                else:
+                    messagebox.showerror("Error", f"Auto-tune failed: {data}")
+            elif kind == "done":
+                self.job_finished(job)
                 self.result_text.delete("1.0", "end")
-                self.result_text.insert("1.0", result)
-            else:
-                messagebox.showerror("Error", f"Transcription failed: {result}")
-            
-            self.is_transcribing = False
-            self.transcribe_button.configure(state="normal")
-            self.clear_button.configure(state="normal")
-            
-        except queue.Empty:
-            pass
-        
-        # Update progress bar
-        if self.is_transcribing:
-            self.progress_bar.set(self.progress_value.get())
-        
+                self.result_text.insert("1.0", data["segments"].full_text())
+                self.show_segments(data["segments"], job.file_path, data["language"])
+                result = dict(data, model=job.model, profile=job.profile)
+                self.record_profile_speed(result)
+                self.progress_bar.set(1.0)
+                status = (
+                    f"Done with the {job.profile} profile ({data['language'] or 'unknown'}) "
+                    f"in {data['elapsed']:.1f}s"
+                )
+                if data["transcribed_seconds"]:
+                    status += f", {data['transcribed_seconds'] / max(data['elapsed'], 1e-6):.1f}x realtime"
+                if data.get("reused_seconds"):
+                    status += f" · {data['reused_seconds']:.0f}s reused from the previous version"
+                scheduler_stats = self.engine.scheduler_stats()
+                if scheduler_stats["loads_avoided"]:
+                    status += (
+                        f" · {scheduler_stats['model_loads']} model load(s) "
+                        f"instead of {scheduler_stats['fifo_loads']} in FIFO order"
+                    )
+                print(f"Pipeline utilization: {format_pipeline_stats(self.engine.pipeline_stats())}")
+                self.update_job_label(job, status)
+            elif kind == "error":
+                self.job_finished(job)
+                messagebox.showerror("Error", f"Transcription failed: {data}")
+            elif kind == "cancelled":
+                self.job_finished(job)
+                self.progress_bar.set(0)
+                self.update_job_label(job, "Cancelled")
+                if not self.is_transcribing:
+                    self.result_text.delete("1.0", "end")
+            elif kind == "preempted":
+                self.update_job_label(job, f"Paused at {job.progress:.0%} for an urgent job, resumes later")
+            elif kind == "started":
+                self.current_job = job
+                self.progress_bar.set(job.progress)
+                self.update_job_label(job, "Starting...")
+            elif job is self.current_job:
+                if kind == "progress":
+                    self.progress_bar.set(data)
+                    self.update_job_label(job, f"Transcribing... {data:.0%}")
+                elif kind == "status":
+                    self.update_job_label(job, data)
+
         # Check queue again after 100ms
         self.after(100, self.check_queue)
-        
+
+    def open_search(self):
+        # Search panel over every archived transcript
+        if self.search_window is not None and self.search_window.winfo_exists():
+            self.search_window.lift()
+            self.search_entry.focus_set()
+            return
+
+        self.search_window = ctk.CTkToplevel(self)
+        self.search_window.title("Search Transcripts")
+        self.search_window.geometry("600x500")
+        self.search_window.transient(self)
+        self.search_window.grid_columnconfigure(0, weight=1)
+        self.search_window.grid_rowconfigure(2, weight=1)
+
+        self.search_entry = ctk.CTkEntry(
+            self.search_window,
+            placeholder_text="Search all transcripts...",
+            height=36,
+            border_color="#2CC985",
+            font=self.font(14)
+        )
+        self.search_entry.grid(row=0, column=0, sticky="ew", padx=20, pady=(20, 5))
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_entry.focus_set()
+
+        self.search_status = ctk.CTkLabel(
+            self.search_window,
+            text="",
+            font=self.font(12),
+            text_color="#666666"
+        )
+        self.search_status.grid(row=1, column=0, sticky="w", padx=20)
+
+        self.search_results = ctk.CTkScrollableFrame(self.search_window, fg_color="#ffffff")
+        self.search_results.grid(row=2, column=0, sticky="nsew", padx=20, pady=(5, 20))
+        self.search_results.grid_columnconfigure(0, weight=1)
+
+    def schedule_search(self, event=None):
+        # Wait for a short pause in typing instead of searching on every key
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        start_time = time.perf_counter()
+        hits = self.archive.search(self.search_entry.get())
+        elapsed = (time.perf_counter() - start_time) * 1000
+
+        for widget in self.search_results.winfo_children():
+            widget.destroy()
+        for i, hit in enumerate(hits):
+            ctk.CTkButton(
+                self.search_results,
+                text=f"{hit['file_name']} [{format_timestamp(hit['start'])}]  {hit['snippet']}",
+                anchor="w",
+                fg_color="transparent",
+                text_color="#333333",
+                hover_color="#e0f5ea",
+                font=self.font(13),
+                command=lambda h=hit: self.show_archived_transcript(h["transcript_id"], h["idx"])
+            ).grid(row=i, column=0, sticky="ew")
+        self.search_status.configure(text=f"{len(hits)} match(es) in {elapsed:.1f} ms")
+
+    def show_archived_transcript(self, transcript_id, segment_index=None):
+        # Show a stored transcript with timestamps and jump to the given segment
+        transcript = self.archive.transcript(transcript_id)
+        segments = self.archive.segments(transcript_id)
+        self.result_text.delete("1.0", "end")
+        self.result_text.insert("1.0", "".join(
+            f"[{format_timestamp(segment['start'])}] {segment['text']}\n" for segment in segments
+        ))
+        self.file_label.configure(text=f"Archive: {transcript['file_name']} ({transcript['model']})")
+        self.show_segments(SegmentStore.from_segments(segments), transcript["file_name"], transcript["language"])
+
+        if segment_index is not None:
+            line = segment_index + 1
+            self.result_text.tag_remove("search_hit", "1.0", "end")
+            self.result_text.tag_add("search_hit", f"{line}.0", f"{line}.end")
+            self.result_text.tag_config("search_hit", background="#e0f5ea")
+            self.result_text.see(f"{line}.0")
+
+    def on_close(self):
+        print(self.latency_monitor.summary())
+        self.latency_monitor.uninstall()
+        self.engine.shutdown()
+        self.archive.close()
+        self.destroy()
+
     def select_model(self, model):
         # Don't do anything if this model is already selected
         if self.selected_model_button == self.model_buttons[model]:
@@ -477,7 +921,7 @@ class WhisperGUI(ctk.CTk):
                 fg_color="transparent",
                 text_color="#2CC985",
                 border_color="#2CC985",
-                font=ctk.CTkFont(size=13, weight="normal")
+                font=self.font(13)
             )
         
         # Update newly selected button with instant feedback
@@ -485,13 +929,14 @@ class WhisperGUI(ctk.CTk):
             fg_color="#2CC985",
             text_color="white",
             border_color="#2CC985",
-            font=ctk.CTkFont(size=13, weight="bold")
+            font=self.font(13, "bold")
         )
         
         # Update selected button reference and model size
         self.selected_model_button = self.model_buttons[model]
         self.model_size.set(model)
-        
+        self.update_speed_label()
+
         # Hide tooltip if visible
         self.hide_model_tooltip()
 
@@ -815,9 +1260,6 @@ if __name__ == "__main__":
     
     def transcribe_audio(self, file_path, model_size):
         try:
-            # Set environment variable to disable SSL verification
-            os.environ['PYTHONHTTPSVERIFY'] = '0'
-            
             # Check if FFmpeg is installed (10%)
             self.after(0, lambda: self.progress_bar.set(0.1))
             self.after(0, lambda: self.progress_text.set("10% - Checking FFmpeg..."))